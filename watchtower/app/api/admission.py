@@ -0,0 +1,139 @@
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import logging
+import math
+import time
+
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+admission_in_flight = Gauge(
+    'ccc_admission_in_flight',
+    'Requests currently executing against the upstream API',
+    ['endpoint']
+)
+
+admission_queued = Gauge(
+    'ccc_admission_queued',
+    'Requests waiting for a concurrency slot',
+    ['endpoint']
+)
+
+admission_shed = Counter(
+    'ccc_admission_shed_total',
+    'Requests rejected by admission control',
+    ['endpoint', 'reason']
+)
+
+admission_coalesced = Counter(
+    'ccc_admission_coalesced_total',
+    'Requests served by joining an in-flight call',
+    ['endpoint']
+)
+
+
+class TokenBucket:
+    """Limiteur de débit : `rate` jetons/s, rafale maximale de `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> Optional[float]:
+        """Consomme un jeton ; sinon retourne le délai avant le prochain jeton"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return None
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Contrôle d'admission d'un endpoint qui sollicite l'API CCC :
+    coalescence des appels concurrents, limite de débit, limite de concurrence
+    et rejet rapide (429/503 + Retry-After) quand la file est pleine.
+    """
+
+    def __init__(self, endpoint: str, max_concurrency: int, rate: float, burst: int,
+                 max_queue: int, queue_timeout: float):
+        self.endpoint = endpoint
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._admitted = 0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _shed(self, status_code: int, reason: str, retry_after: float):
+        admission_shed.labels(endpoint=self.endpoint, reason=reason).inc()
+        logger.warning(f"Shedding request on {self.endpoint}: {reason}")
+        raise HTTPException(
+            status_code=status_code,
+            detail=f"Too many requests on {self.endpoint} ({reason})",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    async def _admit(self, call: Callable[[], Awaitable[T]]) -> T:
+        retry_after = self.bucket.try_acquire()
+        if retry_after is not None:
+            self._shed(429, "rate_limited", retry_after)
+
+        # Requêtes en cours + en attente : au-delà, rejet immédiat sans mise en file
+        if self._admitted >= self.max_concurrency + self.max_queue:
+            self._shed(503, "queue_full", self.queue_timeout)
+
+        self._admitted += 1
+        try:
+            admission_queued.labels(endpoint=self.endpoint).inc()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._shed(503, "queue_timeout", self.queue_timeout)
+            finally:
+                admission_queued.labels(endpoint=self.endpoint).dec()
+
+            admission_in_flight.labels(endpoint=self.endpoint).inc()
+            try:
+                return await call()
+            finally:
+                admission_in_flight.labels(endpoint=self.endpoint).dec()
+                self._semaphore.release()
+        finally:
+            self._admitted -= 1
+
+    async def run(self, call: Callable[[], Awaitable[T]], key: str = "default") -> T:
+        """Exécute `call` ou rejoint l'appel identique déjà en cours (single-flight)"""
+        task = self._in_flight.get(key)
+        if task is not None:
+            admission_coalesced.labels(endpoint=self.endpoint).inc()
+        else:
+            task = asyncio.ensure_future(self._admit(call))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shield : l'annulation d'un client n'interrompt pas l'appel partagé
+        return await asyncio.shield(task)
+
+
+_controllers: Dict[str, AdmissionController] = {}
+
+
+def admission(endpoint: str) -> AdmissionController:
+    """Contrôleur d'admission de l'endpoint, configuré par settings.ADMISSION_LIMITS"""
+    controller = _controllers.get(endpoint)
+    if controller is None:
+        limits = settings.ADMISSION_LIMITS.get(endpoint, settings.ADMISSION_LIMITS["default"])
+        controller = AdmissionController(endpoint, **limits)
+        _controllers[endpoint] = controller
+    return controller
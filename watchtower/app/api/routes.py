@@ -1,20 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Optional
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 
-from app.services.collector import GameplayCollector, inject_mock_metrics
+from app.services.collector import (
+    GameplayCollector, inject_mock_metrics, totals_by_label, pvp_actions, resource_collected
+)
+from app.services.realms import realm_manager
 from app.services.analyzer import MetricsAnalyzer
-from app.models.metrics import MetricResponse, DashboardStats
-from app.db import get_db
+from app.services.alerting import alert_engine
+from app.services.event_impact import event_impact
+from app.models.metrics import MetricResponse, DashboardStats, MetricHistory
+from app.services.exporter import stream_parquet, EXPORT_TABLES
+from app.db import get_db, engine
+from app.api.admission import admission
 
 router = APIRouter()
-collector = GameplayCollector()
+
+
+def get_collector(realm: Optional[str] = None) -> GameplayCollector:
+    """Collector du royaume demandé (royaume par défaut si absent)"""
+    collector = realm_manager.get(realm)
+    if collector is None:
+        raise HTTPException(status_code=404, detail=f"Unknown realm: {realm}")
+    return collector
+
+
+@router.get("/realms")
+async def get_realms():
+    """Royaumes collectés"""
+    return {
+        "default_realm": realm_manager.default_realm,
+        "realms": [
+            {"name": name, "url": realm["url"], "interval": realm["interval"]}
+            for name, realm in realm_manager.realms.items()
+        ]
+    }
 
 @router.get("/metrics/current", response_model=Dict)
-async def get_current_metrics():
+async def get_current_metrics(collector: GameplayCollector = Depends(get_collector)):
     """Récupère les métriques actuelles"""
-    metrics = await collector.collect_all_metrics()
+    metrics = await admission("metrics_current").run(collector.collect_all_metrics, key=collector.realm)
     
     # Vérifier si la collecte a réussi
     if metrics.get("status") == "error":
@@ -23,9 +50,9 @@ async def get_current_metrics():
     return metrics
 
 @router.get("/metrics/nomads")
-async def get_nomad_metrics():
+async def get_nomad_metrics(collector: GameplayCollector = Depends(get_collector)):
     """Métriques spécifiques aux Nomads"""
-    result = await collector.collect_nomad_metrics()
+    result = await admission("metrics_nomads").run(collector.collect_nomad_metrics, key=collector.realm)
     
     if result.get("status") == "error":
         raise HTTPException(status_code=503, detail=result.get("message", "Unknown error"))
@@ -33,9 +60,9 @@ async def get_nomad_metrics():
     return result
 
 @router.get("/metrics/resources")
-async def get_resource_metrics():
+async def get_resource_metrics(collector: GameplayCollector = Depends(get_collector)):
     """Métriques de ressources"""
-    result = await collector.collect_resource_metrics()
+    result = await admission("metrics_resources").run(collector.collect_resource_metrics, key=collector.realm)
     
     if result.get("status") == "error":
         raise HTTPException(status_code=503, detail=result.get("message", "Unknown error"))
@@ -43,9 +70,9 @@ async def get_resource_metrics():
     return result
 
 @router.get("/metrics/dwellings")
-async def get_dwelling_metrics():
+async def get_dwelling_metrics(collector: GameplayCollector = Depends(get_collector)):
     """Métriques des Dwellings"""
-    result = await collector.collect_dwelling_metrics()
+    result = await admission("metrics_dwellings").run(collector.collect_dwelling_metrics, key=collector.realm)
     
     if result.get("status") == "error":
         raise HTTPException(status_code=503, detail=result.get("message", "Unknown error"))
@@ -53,9 +80,9 @@ async def get_dwelling_metrics():
     return result
 
 @router.get("/metrics/pvp")
-async def get_pvp_metrics():
+async def get_pvp_metrics(collector: GameplayCollector = Depends(get_collector)):
     """Métriques PvP"""
-    result = await collector.collect_pvp_metrics()
+    result = await admission("metrics_pvp").run(collector.collect_pvp_metrics, key=collector.realm)
     
     if result.get("status") == "error":
         raise HTTPException(status_code=503, detail=result.get("message", "Unknown error"))
@@ -63,15 +90,76 @@ async def get_pvp_metrics():
     return result
 
 @router.get("/metrics/events")
-async def get_event_metrics():
+async def get_event_metrics(collector: GameplayCollector = Depends(get_collector)):
     """Métriques des événements de jeu"""
-    result = await collector.collect_event_metrics()
+    result = await admission("metrics_events").run(collector.collect_event_metrics, key=collector.realm)
     
     if result.get("status") == "error":
         raise HTTPException(status_code=503, detail=result.get("message", "Unknown error"))
     
     return result
 
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Les timestamps sont stockés en UTC naïf : convertit une date avec fuseau (ex. ...Z de Grafana)"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+@router.get("/metrics/history", response_model=MetricHistory)
+async def get_metric_history(
+    metric: str,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    points: int = Query(500, ge=2, le=5000),
+    realm: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Historique d'une métrique, sous-échantillonné côté serveur à `points` points maximum"""
+    end = naive_utc(end) or datetime.utcnow()
+    start = naive_utc(start) or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    
+    try:
+        analyzer = MetricsAnalyzer(db)
+        return analyzer.get_metric_history(metric, start, end, points, realm)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching metric history: {str(e)}")
+
+@router.get("/players/active")
+async def get_active_players(
+    time_window: int = 3600,
+    clan_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    realm: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Nombre estimé de joueurs distincts actifs (global, par clan ou par événement)"""
+    try:
+        analyzer = MetricsAnalyzer(db)
+        return {
+            "active_players": analyzer.count_active_players(time_window, clan_id, event_type, realm),
+            "time_window": time_window,
+            "clan_id": clan_id,
+            "event_type": event_type,
+            "realm": realm,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error counting active players: {str(e)}")
+
+@router.get("/events/top")
+async def get_top_events(limit: int = Query(10, ge=1, le=100)):
+    """Événements de jeu classés par impact sur l'activité"""
+    events = event_impact.top_events(limit)
+    return {
+        "total_events": len(events),
+        "events": events,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 @router.get("/dashboard/stats", response_model=DashboardStats)
 async def get_dashboard_stats(
     time_window: int = 3600,
@@ -87,11 +175,17 @@ async def get_dashboard_stats(
         # Obtenir les joueurs les plus actifs
         top_players = analyzer.get_top_players(limit=10)
         
+        # Ressources et PvP ne sont pas stockés : totaux des compteurs Prometheus depuis le démarrage
+        pvp_activity = totals_by_label(pvp_actions, "action_type")
+        
         return DashboardStats(
             active_players=engagement.get('active_players', 0),
             total_actions=engagement.get('total_actions', 0),
             avg_actions_per_player=engagement.get('avg_actions_per_player', 0),
+            resources_collected=totals_by_label(resource_collected, "resource_type"),
             top_players=top_players,
+            top_events=event_impact.top_events(limit=5),
+            pvp_activity={action_type: int(count) for action_type, count in pvp_activity.items()},
             timestamp=datetime.utcnow()
         )
         
@@ -99,25 +193,11 @@ async def get_dashboard_stats(
         raise HTTPException(status_code=500, detail=f"Error generating dashboard stats: {str(e)}")
 
 @router.get("/alerts")
-async def get_alerts(db: Session = Depends(get_db)):
+async def get_alerts():
     """Récupère les alertes actives"""
     try:
-        analyzer = MetricsAnalyzer(db)
-        
-        # Détecter les anomalies
-        anomalies = analyzer.detect_anomalies()
-        
-        # Formater les alertes
-        alerts = []
-        for anomaly in anomalies:
-            alerts.append({
-                "type": anomaly.get('type'),
-                "severity": anomaly.get('severity', 'warning'),
-                "message": anomaly.get('message'),
-                "value": anomaly.get('value'),
-                "threshold": anomaly.get('threshold'),
-                "timestamp": datetime.utcnow().isoformat()
-            })
+        # Les règles sont évaluées à chaque collecte : on lit simplement l'état courant
+        alerts = alert_engine.current_alerts()
         
         return {
             "total_alerts": len(alerts),
@@ -129,20 +209,51 @@ async def get_alerts(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error fetching alerts: {str(e)}")
 
 @router.post("/metrics/collect")
-async def trigger_collection():
+async def trigger_collection(collector: GameplayCollector = Depends(get_collector)):
     """Déclenche manuellement une collecte de métriques"""
     try:
-        metrics = await collector.collect_all_metrics()
+        # Limitée par l'admission ; un tick déjà en cours (planifié ou manuel) est rejoint
+        metrics = await admission("collect").run(
+            lambda: realm_manager.run_realm_tick(collector.realm),
+            key=collector.realm
+        )
         return {
             "status": "success",
             "message": "Metrics collection triggered",
             "data": metrics
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Collection failed: {str(e)}")
 
 @router.post("/inject-mock")
 async def inject_mock():
     """Injecte des métriques Prometheus fictives pour le dashboard (dev/demo)."""
-    inject_mock_metrics()
+    async def inject():
+        inject_mock_metrics()
+    
+    await admission("inject_mock").run(inject)
     return {"status": "ok", "message": "Mock metrics injected"}
+
+@router.get("/export")
+async def export_table(
+    table: str = "gameplay_metrics",
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to")
+):
+    """Exporte une table en Parquet (streaming, lecture par chunks)"""
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=400, detail=f"Unknown table: {table}")
+
+    end = naive_utc(end) or datetime.utcnow()
+    start = naive_utc(start) or end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+    filename = f"{table}_{start:%Y%m%dT%H%M%S}_{end:%Y%m%dT%H%M%S}.parquet"
+    return StreamingResponse(
+        stream_parquet(engine, table, start, end),
+        media_type="application/vnd.apache.parquet",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,50 @@
+"""
+Recalcul parallèle des agrégats et des joueurs suspects sur l'historique.
+
+Usage :
+    python -m app.cli.backfill --from 2025-11-01 --to 2025-12-01 --checkpoint /data/backfill.json
+"""
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta
+
+from app.services.backfill import run_backfill
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backfill des agrégats et suspects")
+    parser.add_argument("--from", dest="start", type=datetime.fromisoformat,
+                        default=datetime.utcnow() - timedelta(days=7),
+                        help="Date de début (ISO, incluse)")
+    parser.add_argument("--to", dest="end", type=datetime.fromisoformat,
+                        default=datetime.utcnow(),
+                        help="Date de fin (ISO, exclue)")
+    parser.add_argument("--chunk-seconds", type=int, default=3600,
+                        help="Durée d'un chunk en secondes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Nombre de processus workers")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Fichier de checkpoint pour reprendre un backfill interrompu")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    summary = run_backfill(
+        args.start,
+        args.end,
+        chunk_seconds=args.chunk_seconds,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint
+    )
+    logger.info(f"Backfill finished: {summary}")
+    if summary["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
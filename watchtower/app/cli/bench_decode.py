@@ -0,0 +1,87 @@
+"""
+Micro-benchmark du décodage des réponses de l'API CCC : json.loads + dicts
+contre décodage msgspec typé, boucle de traitement du collecteur comprise.
+
+Usage :
+    python -m app.cli.bench_decode --items 100000 --repeat 5
+"""
+import argparse
+import collections
+import json
+import logging
+import random
+import time
+
+from app.models.ccc import nomads_decoder
+from app.services.collector import GameplayCollector
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACTION_TYPES = ["harvest", "explore", "build", "trade", "attack"]
+STATUSES = ["success", "success", "success", "failed"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark du décodage des payloads CCC")
+    parser.add_argument("--items", type=int, default=100_000, help="Nomads par payload")
+    parser.add_argument("--players", type=int, default=500, help="Joueurs distincts")
+    parser.add_argument("--repeat", type=int, default=5, help="Nombre de mesures (meilleure retenue)")
+    return parser.parse_args()
+
+
+def build_payload(items: int, players: int) -> bytes:
+    """Payload /nomads synthétique, avec des champs que le collecteur ignore"""
+    nomads = [
+        {
+            "player_id": f"player_{random.randrange(players)}",
+            "clan_id": f"clan_{random.randrange(20)}",
+            "action_type": random.choice(ACTION_TYPES),
+            "status": random.choice(STATUSES),
+            "position": {"x": random.random(), "y": random.random()},
+            "inventory": [random.randrange(100) for _ in range(3)]
+        }
+        for _ in range(items)
+    ]
+    return json.dumps({"nomads": nomads}).encode()
+
+
+def process_dicts(content: bytes) -> int:
+    """Chemin d'origine : json.loads puis dict.get dans la boucle chaude"""
+    nomads = json.loads(content).get("nomads", [])
+    counts = collections.Counter(
+        (nomad.get("action_type", "unknown"), nomad.get("player_id", "unknown")) for nomad in nomads
+    )
+    failed = sum(1 for nomad in nomads if nomad.get("status") == "failed")
+    return len(counts) + failed
+
+
+def process_structs(collector: GameplayCollector, content: bytes) -> int:
+    """Chemin du collecteur : décodage typé puis traitement des structs"""
+    return collector._process_nomads(nomads_decoder.decode(content))["failed_actions"]
+
+
+def best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    args = parse_args()
+    content = build_payload(args.items, args.players)
+    collector = GameplayCollector(realm="bench", base_url="http://localhost")
+
+    dicts = best_of(args.repeat, process_dicts, content)
+    structs = best_of(args.repeat, process_structs, collector, content)
+
+    logger.info(f"Payload: {args.items} nomads, {len(content) / 1e6:.1f} MB")
+    logger.info(f"json.loads + dict : {dicts * 1000:.1f} ms")
+    logger.info(f"msgspec + structs : {structs * 1000:.1f} ms ({dicts / structs:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
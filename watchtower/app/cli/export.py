@@ -0,0 +1,43 @@
+"""
+Export de l'historique gameplay au format Parquet.
+
+Usage :
+    python -m app.cli.export --from 2025-12-01 --to 2025-12-08 --output /data/export
+"""
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from app.db import engine
+from app.services.exporter import ParquetExporter, EXPORT_TABLES, DEFAULT_CHUNK_SIZE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export Parquet de l'historique gameplay")
+    parser.add_argument("--from", dest="start", type=datetime.fromisoformat,
+                        default=datetime.utcnow() - timedelta(days=7),
+                        help="Date de début (ISO, incluse)")
+    parser.add_argument("--to", dest="end", type=datetime.fromisoformat,
+                        default=datetime.utcnow(),
+                        help="Date de fin (ISO, exclue)")
+    parser.add_argument("--output", required=True, help="Répertoire de sortie")
+    parser.add_argument("--tables", nargs="+", choices=list(EXPORT_TABLES),
+                        default=list(EXPORT_TABLES), help="Tables à exporter")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Lignes lues par chunk")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    exporter = ParquetExporter(engine, args.output, chunk_size=args.chunk_size)
+    exported = exporter.export(args.tables, args.start, args.end)
+    for table_name, count in exported.items():
+        logger.info(f"{table_name}: {count} rows")
+
+
+if __name__ == "__main__":
+    main()
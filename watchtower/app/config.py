@@ -6,7 +6,8 @@ from typing import Dict, Any
 class Settings:
     def __init__(self):
         # Dynamic
-        self.CCC_API_URL = os.environ["CCC_API_URL"]
+        # Optionnel si CCC_REALMS est défini
+        self.CCC_API_URL = os.environ.get("CCC_API_URL")
         self.CCC_API_KEY = None
         self.DATABASE_URL = os.environ["DATABASE_URL"]
         # Integers
@@ -17,6 +18,87 @@ class Settings:
         except ValueError as e:
             raise ValueError("METRICS_COLLECTION_INTERVAL must be an integer") from e
 
+        # Royaumes (realms/shards) collectés : liste JSON [{"name", "url", "api_key"?, "interval"?}]
+        try:
+            realms = json.loads(os.environ.get("CCC_REALMS", "null"))
+        except json.JSONDecodeError as e:
+            raise ValueError("CCC_REALMS must be valid JSON") from e
+        if realms is None:
+            if not self.CCC_API_URL:
+                raise KeyError("CCC_API_URL or CCC_REALMS is required")
+            realms = [{"name": "default", "url": self.CCC_API_URL}]
+        self.CCC_REALMS = [
+            {
+                "name": realm["name"],
+                "url": realm["url"],
+                "api_key": realm.get("api_key", self.CCC_API_KEY),
+                "interval": int(realm.get("interval", self.METRICS_COLLECTION_INTERVAL))
+            }
+            for realm in realms
+        ]
+        if len({realm["name"] for realm in self.CCC_REALMS}) != len(self.CCC_REALMS):
+            raise ValueError("CCC_REALMS names must be unique")
+
+        # Clés de extra_data indexées (expression index), surchargeable en JSON
+        try:
+            self.EXTRA_DATA_INDEXED_KEYS: Dict[str, list] = json.loads(
+                os.environ.get("EXTRA_DATA_INDEXED_KEYS", "null")
+            ) or {
+                "gameplay_metrics": ["status", "action_type"],
+                "event_metrics": ["status", "event_key"]
+            }
+        except json.JSONDecodeError as e:
+            raise ValueError("EXTRA_DATA_INDEXED_KEYS must be valid JSON") from e
+
+        # Sketches HyperLogLog des joueurs distincts
+        self.HLL_PRECISION = int(os.environ.get("HLL_PRECISION", 12))
+        self.HLL_BUCKET_SECONDS = int(os.environ.get("HLL_BUCKET_SECONDS", 300))
+
+        # Analyse d'impact des événements : fenêtres avant/après et rétention de l'anneau
+        self.EVENT_IMPACT_WINDOW = int(os.environ.get("EVENT_IMPACT_WINDOW", 600))
+        self.EVENT_IMPACT_RETENTION = int(os.environ.get("EVENT_IMPACT_RETENTION", 6 * 3600))
+
+        # Snapshots PlayerActivity : lignes écrites sur changement, keyframe complète au moins toutes les N secondes
+        self.PLAYER_ACTIVITY_KEYFRAME_INTERVAL = int(os.environ.get("PLAYER_ACTIVITY_KEYFRAME_INTERVAL", 3600))
+
+        # Contrôle d'admission des endpoints qui sollicitent l'API CCC
+        self.ADMISSION_LIMITS = {
+            "default": {
+                "max_concurrency": 4,
+                "rate": 5.0,
+                "burst": 10,
+                "max_queue": 20,
+                "queue_timeout": 5.0
+            },
+            "collect": {
+                "max_concurrency": 1,
+                "rate": 0.5,
+                "burst": 2,
+                "max_queue": 5,
+                "queue_timeout": 10.0
+            },
+            "inject_mock": {
+                "max_concurrency": 1,
+                "rate": 0.2,
+                "burst": 1,
+                "max_queue": 0,
+                "queue_timeout": 1.0
+            }
+        }
+
+        # Appels à l'API CCC : timeout, disjoncteur par endpoint et requêtes couvertes (hedging)
+        self.CCC_API_TIMEOUT = float(os.environ.get("CCC_API_TIMEOUT", 30.0))
+        self.CIRCUIT_BREAKER = {
+            "failure_threshold": int(os.environ.get("CIRCUIT_BREAKER_FAILURES", 5)),
+            "reset_timeout": float(os.environ.get("CIRCUIT_BREAKER_RESET_TIMEOUT", 30.0))
+        }
+        self.REQUEST_HEDGING = {
+            "enabled": os.environ.get("REQUEST_HEDGING", "1") != "0",
+            "quantile": 0.95,
+            "min_samples": 20,
+            "min_delay": 0.05
+        }
+
         # Static
         self.ALERT_THRESHOLDS = {
             "low_activity": 10,
@@ -24,5 +106,36 @@ class Settings:
             "resource_warning": 0.8
         }
 
+        # Règles d'alerte évaluées à chaque collecte sur des agrégats glissants, par royaume.
+        # "aggregation" : sum, avg (moyenne par collecte, indépendante du nombre de ticks) ou ratio.
+        # "threshold" référence une clé de ALERT_THRESHOLDS (ou une valeur numérique).
+        self.ALERT_RULES = [
+            {
+                "name": "low_activity",
+                "metric": "nomad_actions",
+                "aggregation": "avg",
+                "window": 300,
+                "operator": "<",
+                "threshold": "low_activity",
+                "for": 60,
+                "hysteresis": 0.2,
+                "severity": "warning",
+                "message": "Activité faible détectée: {value:.0f} actions par collecte (moyenne sur 5 min)"
+            },
+            {
+                "name": "high_failure_rate",
+                "metric": "failed_actions",
+                "denominator": "nomad_actions",
+                "aggregation": "ratio",
+                "window": 600,
+                "operator": ">",
+                "threshold": "high_failure_rate",
+                "for": 60,
+                "hysteresis": 0.1,
+                "severity": "critical",
+                "message": "Taux d'échec élevé: {value:.2%}"
+            }
+        ]
+
 
 settings = Settings()
@@ -1,13 +1,86 @@
-from sqlalchemy import create_engine
+from typing import List
+import logging
+import re
+
+from sqlalchemy import create_engine, inspect, text, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex
 from app.config import settings
-from app.models.metrics import Base
+from app.models.metrics import Base, PlayerActivity
+
+logger = logging.getLogger(__name__)
 
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
 
+
+def _build_extra_data_indexes() -> List[Index]:
+    """Déclare un index d'expression (extra_data ->> 'clé') par clé configurée"""
+    indexes = []
+    for table_name, keys in settings.EXTRA_DATA_INDEXED_KEYS.items():
+        table = Base.metadata.tables.get(table_name)
+        if table is None or "extra_data" not in table.c:
+            logger.warning(f"Cannot index extra_data keys on unknown table: {table_name}")
+            continue
+        for key in keys:
+            name = f"ix_{table_name}_extra_data_{re.sub(r'[^a-zA-Z0-9_]', '_', key)}"
+            # Même expression que les filtres `extra_data[key].as_string()` des requêtes
+            indexes.append(Index(name, table.c.extra_data[key].as_string()))
+    return indexes
+
+
+extra_data_indexes = _build_extra_data_indexes()
+
+
+def _migrate_extra_data_to_jsonb(conn):
+    """Convertit les colonnes extra_data JSON existantes en JSONB"""
+    inspector = inspect(conn)
+    # Toutes les tables du modèle qui déclarent extra_data, indexées ou non
+    for table_name, table in Base.metadata.tables.items():
+        if "extra_data" not in table.c or not inspector.has_table(table_name):
+            continue
+        for column in inspector.get_columns(table_name):
+            if column["name"] == "extra_data" and not isinstance(column["type"], JSONB):
+                logger.info(f"Migrating {table_name}.extra_data to JSONB...")
+                conn.execute(text(
+                    f"ALTER TABLE {table_name} ALTER COLUMN extra_data TYPE JSONB USING extra_data::jsonb"
+                ))
+
+
+def _add_realm_columns(conn):
+    """Ajoute la colonne realm aux tables créées avant le multi-royaume"""
+    inspector = inspect(conn)
+    for table_name in ("gameplay_metrics", "player_activity", "event_metrics"):
+        if not inspector.has_table(table_name):
+            continue
+        if "realm" not in {column["name"] for column in inspector.get_columns(table_name)}:
+            logger.info(f"Adding realm column to {table_name}...")
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN realm VARCHAR DEFAULT 'default'"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_realm ON {table_name} (realm)"))
+
+
+def _add_keyframe_column(conn):
+    """Ajoute is_keyframe à player_activity ; les lignes existantes sont des snapshots complets"""
+    inspector = inspect(conn)
+    if not inspector.has_table("player_activity"):
+        return
+    if "is_keyframe" not in {column["name"] for column in inspector.get_columns("player_activity")}:
+        logger.info("Adding is_keyframe column to player_activity...")
+        conn.execute(text("ALTER TABLE player_activity ADD COLUMN is_keyframe BOOLEAN DEFAULT FALSE"))
+        conn.execute(text("UPDATE player_activity SET is_keyframe = TRUE"))
+
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            _migrate_extra_data_to_jsonb(conn)
+        _add_realm_columns(conn)
+        _add_keyframe_column(conn)
+        Base.metadata.create_all(bind=conn)
+        # create_all ignore les index des tables déjà existantes
+        for index in [*extra_data_indexes, *PlayerActivity.__table__.indexes]:
+            conn.execute(CreateIndex(index, if_not_exists=True))
 
 def get_db():
     db = SessionLocal()
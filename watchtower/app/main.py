@@ -8,14 +8,15 @@ import json
 
 
 from app.config import settings
-from app.services.collector import GameplayCollector, inject_mock_metrics
+from app.services.collector import inject_mock_metrics
+from app.services.realms import realm_manager
+from app.services.event_impact import event_impact, run_event_impact_stage
 from app.api import routes
-from app.db import init_db, get_db  # Import de l'initialisation DB
+from app.db import init_db, get_db, SessionLocal  # Import de l'initialisation DB
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-collector = GameplayCollector()
 scheduler = AsyncIOScheduler()
 
 @asynccontextmanager
@@ -28,6 +29,13 @@ async def lifespan(app: FastAPI):
     init_db()
     logger.info("Database initialized successfully!")
     
+    # Classement des événements par impact rechargé depuis la base
+    db = SessionLocal()
+    try:
+        event_impact.load_index(db)
+    finally:
+        db.close()
+    
 
     # Connexion à NATS gérée par NomadStatsService
     from app.services.nomad_stats import NomadStatsService
@@ -42,16 +50,24 @@ async def lifespan(app: FastAPI):
         'interval',
         seconds=settings.METRICS_COLLECTION_INTERVAL
     )
+    # Tick de collecte par royaume : alimente les agrégats et évalue les règles d'alerte
+    realm_manager.schedule(scheduler)
+    # Étape de fond : impact des événements sur l'activité
+    scheduler.add_job(
+        run_event_impact_stage,
+        'interval',
+        seconds=settings.METRICS_COLLECTION_INTERVAL
+    )
     scheduler.start()
-    logger.info(f"Scheduler started (interval: {settings.METRICS_COLLECTION_INTERVAL}s)")
+    logger.info(f"Scheduler started (interval: {settings.METRICS_COLLECTION_INTERVAL}s, realms: {len(realm_manager.collectors)})")
     
     yield
     
     # Shutdown
     logger.info("Shutting down The Watchtower...")
     scheduler.shutdown()
-    # Fermer le client HTTP du collector
-    await collector.client.aclose()
+    # Fermer les clients HTTP des collectors
+    await realm_manager.close()
     await nomad_stats_service.close_nats()
     logger.info("Shutdown complete")
 
@@ -0,0 +1,109 @@
+from typing import List, Optional, Union
+
+import msgspec
+
+# Schémas typés des réponses de l'API CCC, décodés directement depuis les octets.
+# Les champs inconnus sont ignorés ; les champs absents prennent leur valeur par défaut.
+# Les identifiants peuvent être numériques : ils sont convertis en chaînes au décodage.
+# Un type à null prend la valeur "unknown", comme un type absent.
+
+PlayerId = Union[str, int]
+
+UNKNOWN = "unknown"
+
+
+def _as_str(value: Optional[PlayerId]) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+class Nomad(msgspec.Struct):
+    player_id: Optional[PlayerId] = None
+    action_type: Optional[str] = UNKNOWN
+    clan_id: Optional[PlayerId] = None
+    status: Optional[str] = None
+
+    def __post_init__(self):
+        self.player_id = _as_str(self.player_id)
+        self.clan_id = _as_str(self.clan_id)
+        self.action_type = self.action_type or UNKNOWN
+
+
+class Resource(msgspec.Struct):
+    player_id: Optional[PlayerId] = None
+    type: Optional[str] = UNKNOWN
+    amount: float = 0.0
+
+    def __post_init__(self):
+        self.player_id = _as_str(self.player_id)
+        self.type = self.type or UNKNOWN
+
+
+class Dwelling(msgspec.Struct):
+    player_id: Optional[PlayerId] = None
+    level: Optional[int] = 0
+    active_nomads: Optional[int] = None
+    gold: Optional[float] = None
+    spice: Optional[float] = None
+    actions_count: Optional[int] = None
+    exploration_radius: Optional[float] = None
+
+    def __post_init__(self):
+        self.player_id = _as_str(self.player_id)
+
+
+class PvpAction(msgspec.Struct):
+    type: Optional[str] = UNKNOWN
+
+    def __post_init__(self):
+        self.type = self.type or UNKNOWN
+
+
+class Event(msgspec.Struct):
+    type: Optional[str] = UNKNOWN
+    player_ids: Optional[List[PlayerId]] = None
+    # Identifiant amont et début de l'événement (ISO 8601 ou epoch), quand l'API les fournit
+    id: Optional[Union[str, int]] = None
+    start_time: Optional[Union[str, int, float]] = None
+
+    def __post_init__(self):
+        self.type = self.type or UNKNOWN
+        self.start_time = _as_str(self.start_time)
+        if self.player_ids is not None:
+            self.player_ids = [str(player_id) for player_id in self.player_ids]
+
+
+def event_key(event: Event) -> str:
+    """Clé d'un événement : listé à chaque tick tant qu'il dure, il ne doit être stocké qu'une fois"""
+    if event.id is not None:
+        return str(event.id)
+    if event.start_time:
+        return f"{event.type}@{event.start_time}"
+    # Sans identifiant : un seul événement en cours par type
+    return event.type
+
+
+class NomadsPayload(msgspec.Struct):
+    nomads: List[Nomad] = []
+
+
+class ResourcesPayload(msgspec.Struct):
+    resources: List[Resource] = []
+
+
+class DwellingsPayload(msgspec.Struct):
+    dwellings: List[Dwelling] = []
+
+
+class PvpPayload(msgspec.Struct):
+    pvp_actions: List[PvpAction] = []
+
+
+class EventsPayload(msgspec.Struct):
+    events: List[Event] = []
+
+
+nomads_decoder = msgspec.json.Decoder(NomadsPayload)
+resources_decoder = msgspec.json.Decoder(ResourcesPayload)
+dwellings_decoder = msgspec.json.Decoder(DwellingsPayload)
+pvp_decoder = msgspec.json.Decoder(PvpPayload)
+events_decoder = msgspec.json.Decoder(EventsPayload)
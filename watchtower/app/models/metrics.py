@@ -1,28 +1,39 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, JSON, LargeBinary, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import false
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 Base = declarative_base()
 
+# JSONB sur Postgres (binaire, indexable), JSON ailleurs
+ExtraData = JSON().with_variant(JSONB(), "postgresql")
+
 class GameplayMetric(Base):
     __tablename__ = "gameplay_metrics"
     
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    realm = Column(String, index=True, default="default", server_default="default")
     metric_type = Column(String, index=True)  # nomad_action, resource, event, pvp
     metric_name = Column(String, index=True)
     value = Column(Float)
-    extra_data = Column(JSON)
+    extra_data = Column(ExtraData)
     player_id = Column(String, index=True, nullable=True)
     clan_id = Column(String, index=True, nullable=True)
 
 class PlayerActivity(Base):
     __tablename__ = "player_activity"
+    __table_args__ = (
+        # Reconstruction de l'état d'un joueur à une date donnée
+        Index("ix_player_activity_realm_player_timestamp", "realm", "player_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    realm = Column(String, index=True, default="default", server_default="default")
     player_id = Column(String, index=True)
     dwelling_level = Column(Integer)
     active_nomads = Column(Integer)
@@ -30,16 +41,31 @@ class PlayerActivity(Base):
     spice_amount = Column(Float)
     actions_count = Column(Integer)
     exploration_radius = Column(Float)
+    # Ligne écrite sur changement d'état, ou keyframe complète périodique
+    is_keyframe = Column(Boolean, default=False, server_default=false())
 
 class EventMetric(Base):
     __tablename__ = "event_metrics"
     
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    realm = Column(String, index=True, default="default", server_default="default")
     event_type = Column(String, index=True)  # tempete, raid, benediction, faille
     affected_players = Column(Integer)
     impact_score = Column(Float)
-    extra_data = Column(JSON)
+    extra_data = Column(ExtraData)
+
+class PlayerSketch(Base):
+    __tablename__ = "player_sketches"
+    __table_args__ = (
+        UniqueConstraint("bucket", "dimension", "key", name="uq_player_sketches_bucket_dimension_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(DateTime, index=True)  # début du bucket de temps
+    dimension = Column(String)  # all, clan, event
+    key = Column(String)  # clan_id / event_type ("all" pour la dimension globale)
+    registers = Column(LargeBinary)  # registres HyperLogLog
 
 # Pydantic models pour l'API
 class MetricResponse(BaseModel):
@@ -52,6 +78,21 @@ class MetricResponse(BaseModel):
 class DashboardStats(BaseModel):
     total_actions: int
     active_players: int
+    avg_actions_per_player: float
     resources_collected: Dict[str, float]
+    top_players: list
     top_events: list
     pvp_activity: Dict[str, int]
+    timestamp: datetime
+
+class HistoryPoint(BaseModel):
+    timestamp: datetime
+    value: float
+
+class MetricHistory(BaseModel):
+    metric: str
+    realm: Optional[str] = None
+    start: datetime
+    end: datetime
+    bucket_seconds: float
+    points: List[HistoryPoint]
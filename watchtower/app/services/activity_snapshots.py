@@ -0,0 +1,125 @@
+from typing import Dict, List, NamedTuple, Optional
+from datetime import datetime, timedelta
+import logging
+import zlib
+
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Query, Session
+
+from app.config import settings
+from app.models.metrics import PlayerActivity
+
+logger = logging.getLogger(__name__)
+
+# Champs d'état comparés d'un tick à l'autre
+SNAPSHOT_FIELDS = (
+    "dwelling_level",
+    "active_nomads",
+    "gold_amount",
+    "spice_amount",
+    "actions_count",
+    "exploration_radius",
+)
+
+
+def fingerprint(row: Dict) -> int:
+    """Empreinte de l'état d'un joueur (stable dans le processus)"""
+    return hash(tuple(row.get(field) for field in SNAPSHOT_FIELDS))
+
+
+class PlayerState(NamedTuple):
+    fingerprint: int
+    keyframe_at: datetime
+    seen_at: datetime
+
+
+class ActivityChangeDetector:
+    """
+    Dernier état connu de chaque joueur (empreinte seulement) : seules les lignes qui changent
+    sont écrites, plus une keyframe complète par joueur au moins tous les `keyframe_interval`.
+    Le volume inséré suit le churn réel et non joueurs x ticks.
+    """
+
+    def __init__(self, keyframe_interval: int):
+        self.keyframe_interval = timedelta(seconds=keyframe_interval)
+        self._states: Dict[str, PlayerState] = {}
+        self._purged_at: Optional[datetime] = None
+
+    def _phase(self, player_id: str) -> timedelta:
+        """Décalage propre au joueur : les keyframes ne tombent pas toutes sur le même tick"""
+        return self.keyframe_interval * ((zlib.crc32(player_id.encode()) % 1000) / 1000)
+
+    def changes(self, rows: List[Dict], now: datetime) -> List[Dict]:
+        """Lignes à écrire pour ce tick, marquées is_keyframe ; l'état n'est pas modifié"""
+        changed = []
+        for row in rows:
+            state = self._states.get(row["player_id"])
+            if state is None or now - state.keyframe_at >= self.keyframe_interval:
+                changed.append({**row, "is_keyframe": True})
+            elif fingerprint(row) != state.fingerprint:
+                changed.append({**row, "is_keyframe": False})
+        return changed
+
+    def commit(self, rows: List[Dict], written: List[Dict], now: datetime):
+        """Met à jour l'état une fois les lignes écrites en base"""
+        for row in written:
+            player_id = row["player_id"]
+            if row["is_keyframe"]:
+                # Première keyframe (démarrage) : décalée pour étaler les suivantes
+                keyframe_at = now if player_id in self._states else now - self._phase(player_id)
+            else:
+                keyframe_at = self._states[player_id].keyframe_at
+            self._states[player_id] = PlayerState(fingerprint(row), keyframe_at, now)
+
+        for row in rows:
+            state = self._states.get(row["player_id"])
+            if state is not None and state.seen_at != now:
+                self._states[row["player_id"]] = state._replace(seen_at=now)
+
+        self._purge(now)
+
+    def _purge(self, now: datetime):
+        """Oublie les joueurs absents depuis plus d'une période de keyframe"""
+        if self._purged_at is not None and now - self._purged_at < self.keyframe_interval:
+            return
+        self._purged_at = now
+        cutoff = now - self.keyframe_interval
+        stale = [player_id for player_id, state in self._states.items() if state.seen_at < cutoff]
+        for player_id in stale:
+            del self._states[player_id]
+        if stale:
+            logger.info(f"Forgot state of {len(stale)} inactive players")
+
+
+def snapshot_lookback() -> timedelta:
+    """Écart maximal entre deux lignes d'un joueur toujours présent"""
+    max_interval = max(realm["interval"] for realm in settings.CCC_REALMS)
+    return timedelta(seconds=settings.PLAYER_ACTIVITY_KEYFRAME_INTERVAL + max_interval)
+
+
+def player_state_at(db: Session, at: datetime, realm: Optional[str] = None) -> Query:
+    """
+    État de chaque joueur à la date `at` : dernière ligne <= at, cherchée sur une période
+    de keyframe. Les joueurs sans ligne sur cette période ne sont plus collectés.
+    """
+    filters = [
+        PlayerActivity.timestamp > at - snapshot_lookback(),
+        PlayerActivity.timestamp <= at
+    ]
+    if realm is not None:
+        filters.append(PlayerActivity.realm == realm)
+
+    latest = db.query(
+        PlayerActivity.realm,
+        PlayerActivity.player_id,
+        func.max(PlayerActivity.timestamp).label("timestamp")
+    ).filter(*filters).group_by(
+        PlayerActivity.realm,
+        PlayerActivity.player_id
+    ).subquery()
+
+    return db.query(PlayerActivity).join(latest, and_(
+        PlayerActivity.realm == latest.c.realm,
+        PlayerActivity.player_id == latest.c.player_id,
+        PlayerActivity.timestamp == latest.c.timestamp
+    ))
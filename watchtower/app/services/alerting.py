@@ -0,0 +1,232 @@
+from typing import Dict, List, Optional, Tuple
+from collections import deque
+from datetime import datetime
+import logging
+import operator
+import time
+
+from prometheus_client import Gauge
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+alerts_firing = Gauge(
+    'ccc_alerts_firing',
+    'Alert rules currently firing (1) or not (0)',
+    ['realm', 'rule', 'severity']
+)
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+AGGREGATIONS = ("sum", "avg", "ratio")
+
+INACTIVE = "inactive"
+PENDING = "pending"
+FIRING = "firing"
+
+
+class RollingSum:
+    """Somme (et nombre d'observations) glissante sur une fenêtre de temps, mise à jour en O(1) amorti"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.total = 0.0
+        self.count = 0
+        self.started_at: Optional[float] = None
+        self._samples: deque = deque()
+
+    def add(self, ts: float, value: float):
+        if self.started_at is None:
+            self.started_at = ts
+        self._samples.append((ts, value))
+        self.total += value
+        self.count += 1
+        self._evict(ts)
+
+    def value(self, now: float) -> float:
+        self._evict(now)
+        return self.total
+
+    def mean(self, now: float) -> Optional[float]:
+        """Moyenne par observation : indépendante du nombre de ticks dans la fenêtre"""
+        self._evict(now)
+        return self.total / self.count if self.count else None
+
+    def is_warm(self, now: float) -> bool:
+        """Vrai une fois que la fenêtre couvre une période complète d'observations"""
+        return self.started_at is not None and now - self.started_at >= self.window
+
+    def _evict(self, now: float):
+        cutoff = now - self.window
+        while self._samples and self._samples[0][0] <= cutoff:
+            _, value = self._samples.popleft()
+            self.total -= value
+            self.count -= 1
+
+
+class AlertState:
+    """État d'une règle : inactive -> pending (for) -> firing -> inactive (hystérésis)"""
+
+    def __init__(self):
+        self.status = INACTIVE
+        self.pending_since: Optional[float] = None
+        self.fired_at: Optional[float] = None
+        self.last_seen: Optional[float] = None
+        self.value: Optional[float] = None
+        self.occurrences = 0
+
+
+class AlertRule:
+    def __init__(self, config: Dict, thresholds: Dict[str, float]):
+        self.name = config["name"]
+        self.metric = config["metric"]
+        self.denominator = config.get("denominator")
+        self.aggregation = config.get("aggregation", "sum")
+        self.window = int(config["window"])
+        self.operator = config["operator"]
+        self.for_seconds = int(config.get("for", 0))
+        self.hysteresis = float(config.get("hysteresis", 0.0))
+        self.severity = config.get("severity", "warning")
+        self.message = config.get("message", "{name}: {value}")
+
+        if self.operator not in OPERATORS:
+            raise ValueError(f"Unknown operator in alert rule {self.name}: {self.operator}")
+        if self.aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation in alert rule {self.name}: {self.aggregation}")
+        if self.aggregation == "ratio" and not self.denominator:
+            raise ValueError(f"Alert rule {self.name} needs a denominator for ratio aggregation")
+
+        threshold = config["threshold"]
+        self.threshold = float(thresholds[threshold] if isinstance(threshold, str) else threshold)
+
+    def is_triggered(self, value: float) -> bool:
+        return OPERATORS[self.operator](value, self.threshold)
+
+    def is_cleared(self, value: float) -> bool:
+        """La condition doit repasser la marge d'hystérésis pour lever l'alerte"""
+        margin = abs(self.threshold) * self.hysteresis
+        if self.operator in (">", ">="):
+            return value <= self.threshold - margin
+        return value >= self.threshold + margin
+
+
+class AlertEngine:
+    """
+    Évalue les règles d'alerte de façon incrémentale à chaque collecte, royaume par royaume.
+    Le coût d'une évaluation est O(règles), indépendant du volume stocké.
+    """
+
+    def __init__(self, rules: List[Dict], thresholds: Dict[str, float]):
+        self.rules = [AlertRule(rule, thresholds) for rule in rules]
+        # Métriques suivies et fenêtres associées
+        self._windows: Dict[str, List[int]] = {}
+        for rule in self.rules:
+            for metric in filter(None, (rule.metric, rule.denominator)):
+                windows = self._windows.setdefault(metric, [])
+                if rule.window not in windows:
+                    windows.append(rule.window)
+        # Un agrégat glissant par (royaume, métrique, fenêtre), un état par (règle, royaume)
+        self._aggregates: Dict[Tuple[str, str, int], RollingSum] = {}
+        self.states: Dict[Tuple[str, str], AlertState] = {}
+        self.realms: List[str] = []
+
+    def record(self, metric: str, value: float, ts: Optional[float] = None, realm: str = "default"):
+        """Ajoute une observation aux agrégats du royaume qui suivent cette métrique"""
+        ts = ts if ts is not None else time.time()
+        if realm not in self.realms:
+            self.realms.append(realm)
+        for window in self._windows.get(metric, []):
+            aggregate = self._aggregates.get((realm, metric, window))
+            if aggregate is None:
+                aggregate = self._aggregates[(realm, metric, window)] = RollingSum(window)
+            aggregate.add(ts, value)
+
+    def _rule_value(self, rule: AlertRule, realm: str, now: float) -> Optional[float]:
+        numerator = self._aggregates.get((realm, rule.metric, rule.window))
+        if numerator is None or not numerator.is_warm(now):
+            return None
+        if rule.aggregation == "sum":
+            return numerator.value(now)
+        if rule.aggregation == "avg":
+            return numerator.mean(now)
+
+        denominator = self._aggregates.get((realm, rule.denominator, rule.window))
+        if denominator is None or denominator.value(now) <= 0:
+            return None
+        return numerator.value(now) / denominator.value(now)
+
+    def evaluate(self, now: Optional[float] = None, realm: Optional[str] = None):
+        """Met à jour l'état de chaque règle (appelé à chaque tick de collecte du royaume)"""
+        now = now if now is not None else time.time()
+
+        for realm in [realm] if realm is not None else self.realms:
+            for rule in self.rules:
+                self._evaluate_rule(rule, realm, now)
+
+    def _evaluate_rule(self, rule: AlertRule, realm: str, now: float):
+        state = self.states.setdefault((rule.name, realm), AlertState())
+        value = self._rule_value(rule, realm, now)
+        if value is None:
+            return
+        state.value = value
+        gauge = alerts_firing.labels(realm=realm, rule=rule.name, severity=rule.severity)
+
+        if state.status == FIRING:
+            if rule.is_cleared(value):
+                logger.info(f"Alert resolved: {rule.name} on {realm} (value={value})")
+                state.status = INACTIVE
+                state.pending_since = None
+                state.fired_at = None
+                gauge.set(0)
+            else:
+                # Dédoublonnage : la même alerte reste active, on compte les occurrences
+                state.last_seen = now
+                state.occurrences += 1
+            return
+
+        if not rule.is_triggered(value):
+            state.status = INACTIVE
+            state.pending_since = None
+            return
+
+        if state.status == INACTIVE:
+            state.status = PENDING
+            state.pending_since = now
+
+        if now - state.pending_since >= rule.for_seconds:
+            logger.warning(f"Alert firing: {rule.name} on {realm} (value={value}, threshold={rule.threshold})")
+            state.status = FIRING
+            state.fired_at = now
+            state.last_seen = now
+            state.occurrences = 1
+            gauge.set(1)
+
+    def current_alerts(self) -> List[Dict]:
+        """Alertes actuellement actives, sans recalcul"""
+        alerts = []
+        for realm in self.realms:
+            for rule in self.rules:
+                state = self.states.get((rule.name, realm))
+                if state is None or state.status != FIRING:
+                    continue
+                alerts.append({
+                    "type": rule.name,
+                    "realm": realm,
+                    "severity": rule.severity,
+                    "message": rule.message.format(name=rule.name, value=state.value),
+                    "value": state.value,
+                    "threshold": rule.threshold,
+                    "since": datetime.utcfromtimestamp(state.fired_at).isoformat(),
+                    "last_seen": datetime.utcfromtimestamp(state.last_seen).isoformat(),
+                    "occurrences": state.occurrences
+                })
+        return alerts
+
+
+alert_engine = AlertEngine(settings.ALERT_RULES, settings.ALERT_THRESHOLDS)
@@ -1,27 +1,51 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.models.metrics import GameplayMetric, PlayerActivity, EventMetric
+from app.services.activity_snapshots import player_state_at
+from app.services.downsampling import lttb
+from app.services.distinct_players import (
+    count_distinct_players, count_distinct_players_exact, sketches_cover, scoped_key,
+    DIMENSION_ALL, DIMENSION_REALM, DIMENSION_CLAN, DIMENSION_EVENT
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Nombre de buckets SQL par point renvoyé, affinés ensuite par LTTB
+HISTORY_OVERSAMPLING = 4
+
+# Les timestamps sont stockés en UTC naïf
+EPOCH = datetime(1970, 1, 1)
+
 class MetricsAnalyzer:
     def __init__(self, db: Session):
         self.db = db
     
-    def analyze_player_engagement(self, time_window: int = 3600) -> Dict:
-        """Analyse l'engagement des joueurs sur une période"""
-        cutoff = datetime.utcnow() - timedelta(seconds=time_window)
+    def analyze_player_engagement(self, time_window: int = 3600, end: Optional[datetime] = None,
+                                  realm: Optional[str] = None) -> Dict:
+        """Analyse l'engagement des joueurs sur une période (se terminant à `end`), tous royaumes ou un seul"""
+        end = end or datetime.utcnow()
+        cutoff = end - timedelta(seconds=time_window)
         
-        active_players = self.db.query(PlayerActivity).filter(
-            PlayerActivity.timestamp >= cutoff
-        ).count()
+        # Joueurs distincts (sketches HyperLogLog) et non nombre de snapshots ;
+        # l'historique antérieur aux sketches (backfill) est compté sur les lignes brutes
+        dimension, key = (DIMENSION_REALM, realm) if realm else (DIMENSION_ALL, DIMENSION_ALL)
+        if sketches_cover(self.db, cutoff, dimension, key):
+            active_players = count_distinct_players(self.db, cutoff, end, dimension, key)
+        else:
+            active_players = count_distinct_players_exact(self.db, cutoff, end, realm)
         
-        total_actions = self.db.query(GameplayMetric).filter(
+        # Une ligne nomad_action porte le nombre d'actions apparues dans `value`
+        query = self.db.query(func.coalesce(func.sum(GameplayMetric.value), 0)).filter(
             GameplayMetric.timestamp >= cutoff,
+            GameplayMetric.timestamp < end,
             GameplayMetric.metric_type == 'nomad_action'
-        ).count()
+        )
+        if realm:
+            query = query.filter(GameplayMetric.realm == realm)
+        total_actions = int(query.scalar())
         
         return {
             'active_players': active_players,
@@ -29,54 +53,46 @@ class MetricsAnalyzer:
             'avg_actions_per_player': total_actions / active_players if active_players > 0 else 0
         }
     
-    def detect_anomalies(self) -> List[Dict]:
-        """Détecte les anomalies dans les métriques"""
-        anomalies = []
-        
-        # Vérifier l'activité anormalement basse
-        recent_activity = self.analyze_player_engagement(time_window=300)
-        if recent_activity['total_actions'] < 10:
-            anomalies.append({
-                'type': 'low_activity',
-                'severity': 'warning',
-                'message': f"Activité faible détectée: {recent_activity['total_actions']} actions en 5 min"
-            })
-        
-        # Vérifier les taux d'échec élevés
-        cutoff = datetime.utcnow() - timedelta(minutes=10)
-        failed_actions = self.db.query(GameplayMetric).filter(
-            GameplayMetric.timestamp >= cutoff,
-            GameplayMetric.metadata['status'].astext == 'failed'
-        ).count()
-        
-        total_actions = self.db.query(GameplayMetric).filter(
-            GameplayMetric.timestamp >= cutoff
-        ).count()
-        
-        if total_actions > 0:
-            failure_rate = failed_actions / total_actions
-            if failure_rate > 0.15:
-                anomalies.append({
-                    'type': 'high_failure_rate',
-                    'severity': 'critical',
-                    'message': f"Taux d'échec élevé: {failure_rate:.2%}"
-                })
+    def count_active_players(self, time_window: int = 3600, clan_id: Optional[str] = None,
+                             event_type: Optional[str] = None, realm: Optional[str] = None) -> int:
+        """
+        Nombre estimé de joueurs distincts actifs, globalement, par clan ou par événement.
+        Sans realm : tous royaumes pour le compte global, royaume par défaut pour un clan ou un événement.
+        """
+        end = datetime.utcnow()
+        start = end - timedelta(seconds=time_window)
+        if clan_id:
+            return count_distinct_players(self.db, start, end, DIMENSION_CLAN, scoped_key(realm, clan_id))
+        if event_type:
+            return count_distinct_players(self.db, start, end, DIMENSION_EVENT, scoped_key(realm, event_type))
+        if realm:
+            return count_distinct_players(self.db, start, end, DIMENSION_REALM, realm)
+        return count_distinct_players(self.db, start, end, DIMENSION_ALL, DIMENSION_ALL)
+    
+    def get_actions_per_player(self, action_name: str, start: datetime, end: datetime,
+                               realm: Optional[str] = None) -> Dict[str, int]:
+        """Compte les actions d'un type par joueur sur une période (tous royaumes ou un seul)"""
+        query = self.db.query(
+            GameplayMetric.player_id,
+            func.sum(GameplayMetric.value)
+        ).filter(
+            GameplayMetric.timestamp >= start,
+            GameplayMetric.timestamp < end,
+            GameplayMetric.metric_type == 'nomad_action',
+            GameplayMetric.metric_name == action_name,
+            GameplayMetric.player_id.isnot(None)
+        )
+        if realm:
+            query = query.filter(GameplayMetric.realm == realm)
+        results = query.group_by(
+            GameplayMetric.player_id
+        ).all()
         
-        return anomalies
+        return {player_id: int(count) for player_id, count in results}
     
     def get_top_players(self, limit: int = 10) -> List[Dict]:
-        """Récupère les joueurs les plus actifs"""
-        cutoff = datetime.utcnow() - timedelta(hours=24)
-        
-        results = self.db.query(
-            PlayerActivity.player_id,
-            PlayerActivity.actions_count,
-            PlayerActivity.dwelling_level,
-            PlayerActivity.gold_amount,
-            PlayerActivity.spice_amount
-        ).filter(
-            PlayerActivity.timestamp >= cutoff
-        ).order_by(
+        """Récupère les joueurs les plus actifs (état courant reconstruit depuis keyframes et changements)"""
+        results = player_state_at(self.db, datetime.utcnow()).order_by(
             PlayerActivity.actions_count.desc()
         ).limit(limit).all()
         
@@ -92,3 +108,49 @@ class MetricsAnalyzer:
             }
             for r in results
         ]
+    
+    def get_metric_history(self, metric_name: str, start: datetime, end: datetime, points: int,
+                           realm: Optional[str] = None) -> Dict:
+        """Historique d'une métrique (tous royaumes ou un seul) réduit à `points` points au maximum"""
+        # Agrégation par bucket côté SQL : le volume lu ne dépend pas de la période
+        bucket_count = points * HISTORY_OVERSAMPLING
+        bucket_seconds = max((end - start).total_seconds() / bucket_count, 1.0)
+        epoch = func.extract('epoch', GameplayMetric.timestamp)
+        start_epoch = (start - EPOCH).total_seconds()
+        bucket = func.floor((epoch - start_epoch) / bucket_seconds)
+        
+        query = self.db.query(
+            bucket.label('bucket'),
+            func.avg(GameplayMetric.value).label('value')
+        ).filter(
+            GameplayMetric.metric_name == metric_name,
+            GameplayMetric.timestamp >= start,
+            GameplayMetric.timestamp < end
+        )
+        if realm:
+            query = query.filter(GameplayMetric.realm == realm)
+        results = query.group_by(
+            bucket
+        ).order_by(
+            bucket
+        ).all()
+        
+        # Chaque bucket est représenté par son centre
+        series = [
+            (start_epoch + (float(r.bucket) + 0.5) * bucket_seconds, float(r.value))
+            for r in results
+            if r.value is not None
+        ]
+        series = lttb(series, points)
+        
+        return {
+            'metric': metric_name,
+            'realm': realm,
+            'start': start,
+            'end': end,
+            'bucket_seconds': bucket_seconds,
+            'points': [
+                {'timestamp': EPOCH + timedelta(seconds=ts), 'value': value}
+                for ts, value in series
+            ]
+        }
@@ -0,0 +1,193 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import logging
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.models.metrics import GameplayMetric, PlayerActivity
+from app.services.analyzer import MetricsAnalyzer
+from app.services.nomad_stats import NomadStatsService
+from app.services.storage import bulk_insert
+
+logger = logging.getLogger(__name__)
+
+# Types de métriques produits par le backfill (remplacés à chaque recalcul)
+BACKFILL_METRIC_TYPES = ("aggregate", "suspect")
+
+# Actions analysées pour la détection des joueurs suspects
+SUSPECT_ACTIONS = {
+    "move": "suspect_moves",
+    "create": "suspect_nomads_created",
+}
+
+# Session propre à chaque processus worker
+_worker_session = None
+
+
+def _init_worker(database_url: str):
+    """Ouvre une connexion DB dédiée au worker (jamais partagée après fork)"""
+    global _worker_session
+    engine = create_engine(database_url, pool_size=1, max_overflow=0, pool_pre_ping=True)
+    _worker_session = sessionmaker(bind=engine)
+
+
+def split_range(start: datetime, end: datetime, chunk_seconds: int) -> List[Tuple[datetime, datetime]]:
+    """Découpe [start, end) en chunks de durée fixe"""
+    chunks = []
+    current = start
+    while current < end:
+        chunk_end = min(current + timedelta(seconds=chunk_seconds), end)
+        chunks.append((current, chunk_end))
+        current = chunk_end
+    return chunks
+
+
+def _chunk_realms(db, start: datetime, end: datetime) -> List[str]:
+    """Royaumes ayant de l'activité dans le chunk"""
+    realms = {
+        realm for (realm,) in db.query(GameplayMetric.realm).filter(
+            GameplayMetric.timestamp >= start,
+            GameplayMetric.timestamp < end,
+            GameplayMetric.metric_type == 'nomad_action'
+        ).distinct()
+    } | {
+        realm for (realm,) in db.query(PlayerActivity.realm).filter(
+            PlayerActivity.timestamp >= start,
+            PlayerActivity.timestamp < end
+        ).distinct()
+    }
+    return sorted(realm or "default" for realm in realms) or ["default"]
+
+
+def _realm_rows(analyzer: MetricsAnalyzer, stats_service: NomadStatsService,
+                start: datetime, end: datetime, realm: str) -> List[Dict]:
+    """Agrégats et suspects d'un royaume sur le chunk"""
+    engagement = analyzer.analyze_player_engagement(
+        time_window=int((end - start).total_seconds()),
+        end=end,
+        realm=realm
+    )
+    extra_data = {"chunk_start": start.isoformat(), "chunk_end": end.isoformat()}
+    rows = [
+        {
+            "timestamp": start,
+            "realm": realm,
+            "metric_type": "aggregate",
+            "metric_name": name,
+            "value": float(engagement[name]),
+            "extra_data": extra_data,
+        }
+        for name in ("active_players", "total_actions", "avg_actions_per_player")
+    ]
+
+    for action_name, metric_name in SUSPECT_ACTIONS.items():
+        counts = analyzer.get_actions_per_player(action_name, start, end, realm)
+        if not counts:
+            continue
+        global_avg = sum(counts.values()) / len(counts)
+        suspects = stats_service.top_5_percent_from_counts(counts, global_avg)
+        rows.extend(
+            {
+                "timestamp": start,
+                "realm": realm,
+                "metric_type": "suspect",
+                "metric_name": metric_name,
+                "value": float(counts[player_id]),
+                "player_id": player_id,
+                "extra_data": {**extra_data, "global_avg": round(global_avg, 2)},
+            }
+            for player_id in suspects
+        )
+    return rows
+
+
+def process_chunk(start: datetime, end: datetime) -> Dict:
+    """Recalcule agrégats et suspects d'un chunk, royaume par royaume, et les réécrit en base"""
+    db = _worker_session()
+    try:
+        analyzer = MetricsAnalyzer(db)
+        stats_service = NomadStatsService()
+
+        rows = []
+        for realm in _chunk_realms(db, start, end):
+            rows.extend(_realm_rows(analyzer, stats_service, start, end, realm))
+        suspects_count = sum(1 for row in rows if row["metric_type"] == "suspect")
+
+        # Idempotent : les résultats précédents du chunk sont remplacés
+        db.query(GameplayMetric).filter(
+            GameplayMetric.timestamp >= start,
+            GameplayMetric.timestamp < end,
+            GameplayMetric.metric_type.in_(BACKFILL_METRIC_TYPES)
+        ).delete(synchronize_session=False)
+        bulk_insert(db, GameplayMetric, rows, commit=False)
+        db.commit()
+
+        return {"rows": len(rows), "suspects": suspects_count}
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class BackfillCheckpoint:
+    """Fichier JSON listant les chunks déjà traités pour une plage donnée"""
+
+    def __init__(self, path: str, start: datetime, end: datetime, chunk_seconds: int):
+        self.path = path
+        self.key = {"start": start.isoformat(), "end": end.isoformat(), "chunk_seconds": chunk_seconds}
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            # Un checkpoint d'une autre plage n'est pas réutilisé
+            if state.get("key") == self.key:
+                self.done = set(state.get("done", []))
+
+    def is_done(self, chunk_start: datetime) -> bool:
+        return chunk_start.isoformat() in self.done
+
+    def mark_done(self, chunk_start: datetime):
+        self.done.add(chunk_start.isoformat())
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"key": self.key, "done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+
+def run_backfill(start: datetime, end: datetime, chunk_seconds: int = 3600,
+                 workers: Optional[int] = None, checkpoint_path: Optional[str] = None) -> Dict:
+    """Recalcule l'historique en parallèle sur tous les cœurs disponibles"""
+    checkpoint = BackfillCheckpoint(checkpoint_path, start, end, chunk_seconds)
+    chunks = [c for c in split_range(start, end, chunk_seconds) if not checkpoint.is_done(c[0])]
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Backfill {start} -> {end}: {len(chunks)} chunks to process on {workers} workers")
+
+    summary = {"chunks": 0, "failed": 0, "rows": 0, "suspects": 0}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(settings.DATABASE_URL,)) as executor:
+        futures = {executor.submit(process_chunk, s, e): (s, e) for s, e in chunks}
+        for future in as_completed(futures):
+            chunk_start, chunk_end = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Backfill chunk {chunk_start} -> {chunk_end} failed: {e}")
+                summary["failed"] += 1
+                continue
+
+            checkpoint.mark_done(chunk_start)
+            summary["chunks"] += 1
+            summary["rows"] += result["rows"]
+            summary["suspects"] += result["suspects"]
+            logger.info(f"Chunk {chunk_start} -> {chunk_end} done ({summary['chunks']}/{len(chunks)})")
+
+    return summary
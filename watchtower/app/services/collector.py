@@ -1,9 +1,22 @@
 import httpx
 from prometheus_client import Counter, Histogram, Gauge
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
+import collections
 import asyncio
+import msgspec
 from app.config import settings
+from app.db import SessionLocal
+from app.models.metrics import GameplayMetric, PlayerActivity, EventMetric
+from app.models.ccc import (
+    Event, Nomad, NomadsPayload, ResourcesPayload, DwellingsPayload, PvpPayload, EventsPayload, event_key,
+    nomads_decoder, resources_decoder, dwellings_decoder, pvp_decoder, events_decoder
+)
+from app.services.activity_snapshots import ActivityChangeDetector
+from app.services.alerting import alert_engine
+from app.services.event_impact import event_impact
+from app.services.resilience import CircuitBreaker, LatencyTracker, CLOSED, hedged_requests
+from app.services.storage import bulk_insert
 import logging
 import os
 import time
@@ -14,131 +27,392 @@ logger = logging.getLogger(__name__)
 nomad_actions = Counter(
     'ccc_nomad_actions_total',
     'Total number of nomad actions',
-    ['action_type', 'player_id']
+    ['realm', 'action_type', 'player_id']
 )
 
 resource_collected = Counter(
     'ccc_resources_collected_total',
     'Total resources collected',
-    ['resource_type', 'player_id']
+    ['realm', 'resource_type', 'player_id']
 )
 
 dwelling_levels = Gauge(
     'ccc_dwelling_levels',
     'Current dwelling levels',
-    ['player_id']
+    ['realm', 'player_id']
 )
 
 active_nomads = Gauge(
     'ccc_active_nomads',
     'Number of active nomads',
-    ['player_id']
+    ['realm', 'player_id']
 )
 
 pvp_actions = Counter(
     'ccc_pvp_actions_total',
     'Total PvP actions',
-    ['action_type']
+    ['realm', 'action_type']
 )
 
 event_triggers = Counter(
     'ccc_events_triggered_total',
     'Total game events triggered',
-    ['event_type']
+    ['realm', 'event_type']
 )
 
 api_response_time = Histogram(
     'ccc_api_response_seconds',
     'API response time',
-    ['endpoint']
+    ['realm', 'endpoint']
 )
 
 # Nouveau: métrique pour les erreurs d'API
 api_errors = Counter(
     'ccc_api_errors_total',
     'Total API errors',
-    ['endpoint', 'error_type']
+    ['realm', 'endpoint', 'error_type']
+)
+
+player_activity_rows = Counter(
+    'ccc_player_activity_rows_total',
+    'Player snapshots per tick: written as keyframe, written as delta, or skipped (unchanged)',
+    ['realm', 'kind']
 )
 
+def totals_by_label(metric: Counter, label: str) -> Dict[str, float]:
+    """Totaux d'un compteur Prometheus (depuis le démarrage) regroupés par un label, tous royaumes confondus"""
+    totals: Dict[str, float] = collections.defaultdict(float)
+    for family in metric.collect():
+        for sample in family.samples:
+            if sample.name.endswith("_total"):
+                totals[sample.labels[label]] += sample.value
+    return dict(totals)
+
 class GameplayCollector:
-    def __init__(self):
+    def __init__(self, realm: str = "default", base_url: Optional[str] = None, api_key: Optional[str] = None):
+        self.realm = realm
+        api_key = api_key or settings.CCC_API_KEY
         headers = {}
-        if settings.CCC_API_KEY:
-            headers['Authorization'] = f'Bearer {settings.CCC_API_KEY}'
+        if api_key:
+            headers['Authorization'] = f'Bearer {api_key}'
         
+        # Pool de connexions propre au royaume
         self.client = httpx.AsyncClient(
-            base_url=settings.CCC_API_URL,
-            timeout=30.0,
-            headers=headers
+            base_url=base_url or settings.CCC_API_URL,
+            timeout=settings.CCC_API_TIMEOUT,
+            headers=headers,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
         )
+        
+        # Actions de l'instantané /nomads du tick précédent
+        self._listed_actions: collections.Counter = collections.Counter()
+        
+        # Clés des événements listés au tick précédent
+        self._listed_events: Set[str] = set()
+        
+        # Dernier état connu des joueurs, pour n'écrire que les changements
+        self.activity_changes = ActivityChangeDetector(settings.PLAYER_ACTIVITY_KEYFRAME_INTERVAL)
+        
+        # Disjoncteur et historique de latence par endpoint
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = collections.defaultdict(lambda: LatencyTracker(
+            quantile=settings.REQUEST_HEDGING["quantile"],
+            min_samples=settings.REQUEST_HEDGING["min_samples"],
+            min_delay=settings.REQUEST_HEDGING["min_delay"]
+        ))
     
-    async def _make_request(self, endpoint: str) -> Optional[Dict]:
-        """Effectue une requête à l'API avec gestion d'erreurs améliorée"""
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(self.realm, endpoint, **settings.CIRCUIT_BREAKER)
+            self._breakers[endpoint] = breaker
+        return breaker
+    
+    async def _get(self, endpoint: str, hedge: bool) -> httpx.Response:
+        """GET idempotent, doublé par une seconde requête si la réponse dépasse le p95 observé"""
+        delay = self._latencies[endpoint].hedge_delay() if hedge and settings.REQUEST_HEDGING["enabled"] else None
+        primary = asyncio.ensure_future(self.client.get(endpoint))
+        if delay is None:
+            return await primary
+        
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                hedged_requests.labels(realm=self.realm, endpoint=endpoint, outcome="sent").inc()
+                pending.add(asyncio.ensure_future(self.client.get(endpoint)))
+            
+            # Première réponse exploitable ; sinon le dernier échec
+            fallback = primary
+            while True:
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        if task is not primary:
+                            hedged_requests.labels(realm=self.realm, endpoint=endpoint, outcome="won").inc()
+                        return task.result()
+                    fallback = task
+                if not pending:
+                    return fallback.result()
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _make_request(self, endpoint: str, decoder: msgspec.json.Decoder) -> Optional[msgspec.Struct]:
+        """Effectue une requête à l'API et décode la réponse typée directement depuis les octets"""
+        breaker = self._breaker(endpoint)
+        if not breaker.allow():
+            # Disjoncteur ouvert : échec immédiat au lieu d'attendre le timeout
+            logger.debug(f"Circuit open, skipping {endpoint}")
+            api_errors.labels(realm=self.realm, endpoint=endpoint, error_type="circuit_open").inc()
+            return None
+        
         start_time = datetime.now()
         
         try:
-            response = await self.client.get(endpoint)
+            response = await self._get(endpoint, hedge=breaker.state == CLOSED)
             
             # Mesurer le temps de réponse
             duration = (datetime.now() - start_time).total_seconds()
-            api_response_time.labels(endpoint=endpoint).observe(duration)
+            api_response_time.labels(realm=self.realm, endpoint=endpoint).observe(duration)
+            
+            # Chaque réponse est classée une seule fois : seules 2xx, 401 et 404 (réponses
+            # normales du service) ferment le disjoncteur et alimentent le p95 du hedging
+            status = response.status_code
+            if response.is_success or status in (401, 404):
+                breaker.record_success()
+                self._latencies[endpoint].observe(duration)
+            else:
+                breaker.record_failure()
             
             # Vérifier le code de statut
-            if response.status_code == 404:
+            if status == 404:
                 logger.warning(f"Endpoint not found: {endpoint}")
-                api_errors.labels(endpoint=endpoint, error_type="not_found").inc()
+                api_errors.labels(realm=self.realm, endpoint=endpoint, error_type="not_found").inc()
                 return None
             
-            if response.status_code == 401:
+            if status == 401:
                 logger.error(f"Unauthorized access to {endpoint} - Check API key")
-                api_errors.labels(endpoint=endpoint, error_type="unauthorized").inc()
+                api_errors.labels(realm=self.realm, endpoint=endpoint, error_type="unauthorized").inc()
                 return None
             
-            if response.status_code >= 500:
-                logger.error(f"Server error on {endpoint}: {response.status_code}")
-                api_errors.labels(endpoint=endpoint, error_type="server_error").inc()
+            if status >= 500:
+                logger.error(f"Server error on {endpoint}: {status}")
+                api_errors.labels(realm=self.realm, endpoint=endpoint, error_type="server_error").inc()
                 return None
             
-            response.raise_for_status()
-            return response.json()
+            if not response.is_success:
+                # 429, autres 4xx, redirections
+                logger.error(f"Unexpected status on {endpoint}: {status}")
+                error_type = "rate_limited" if status == 429 else "unexpected_status"
+                api_errors.labels(realm=self.realm, endpoint=endpoint, error_type=error_type).inc()
+                return None
+            
+            return decoder.decode(response.content)
+            
+        except msgspec.DecodeError as e:
+            logger.error(f"Invalid payload from {endpoint}: {e}")
+            api_errors.labels(realm=self.realm, endpoint=endpoint, error_type="invalid_payload").inc()
+            return None
             
         except httpx.TimeoutException:
+            breaker.record_failure()
             logger.error(f"Timeout on endpoint: {endpoint}")
-            api_errors.labels(endpoint=endpoint, error_type="timeout").inc()
+            api_errors.labels(realm=self.realm, endpoint=endpoint, error_type="timeout").inc()
             return None
             
         except httpx.NetworkError as e:
+            breaker.record_failure()
             logger.error(f"Network error on {endpoint}: {e}")
-            api_errors.labels(endpoint=endpoint, error_type="network_error").inc()
+            api_errors.labels(realm=self.realm, endpoint=endpoint, error_type="network_error").inc()
             return None
             
+        except asyncio.CancelledError:
+            # Libère l'appel d'essai d'un disjoncteur half-open
+            breaker.record_failure()
+            raise
+            
         except Exception as e:
+            breaker.record_failure()
             logger.error(f"Unexpected error on {endpoint}: {e}")
-            api_errors.labels(endpoint=endpoint, error_type="unknown").inc()
+            api_errors.labels(realm=self.realm, endpoint=endpoint, error_type="unknown").inc()
             return None
     
-    async def collect_nomad_metrics(self) -> Dict:
+    def _persist(self, model, rows: List[Dict], sketch_rows: Optional[List[Dict]] = None):
+        db = SessionLocal()
+        try:
+            bulk_insert(db, model, rows, sketch_rows=sketch_rows)
+        finally:
+            db.close()
+    
+    async def _store(self, model, rows: List[Dict], sketch_rows: Optional[List[Dict]] = None) -> bool:
+        """Enregistre les lignes collectées en base sans bloquer la boucle d'événements"""
+        try:
+            await asyncio.to_thread(self._persist, model, rows, sketch_rows)
+            return True
+        except Exception as e:
+            logger.error(f"Error storing {model.__tablename__} rows: {e}")
+            return False
+    
+    async def _store_new_actions(self, nomads: List[Nomad]):
+        """
+        /nomads est un instantané : seules les actions apparues depuis le tick précédent
+        sont enregistrées, agrégées en une ligne par (joueur, clan, action, statut) avec value = nombre.
+        """
+        current = collections.Counter(
+            (nomad.player_id, nomad.clan_id, nomad.action_type, nomad.status) for nomad in nomads
+        )
+        new_actions = current - self._listed_actions
+        now = datetime.utcnow()
+        rows = [
+            {
+                "timestamp": now,
+                "realm": self.realm,
+                "metric_type": "nomad_action",
+                "metric_name": action_type,
+                "value": float(count),
+                "extra_data": {"action_type": action_type, "status": status},
+                "player_id": player_id,
+                "clan_id": clan_id
+            }
+            for (player_id, clan_id, action_type, status), count in new_actions.items()
+        ]
+        if not rows or await self._store(GameplayMetric, rows):
+            self._listed_actions = current
+    
+    def _stored_event_keys(self, keys: List[str]) -> Set[str]:
+        db = SessionLocal()
+        try:
+            rows = db.query(EventMetric.extra_data['event_key'].as_string()).filter(
+                EventMetric.realm == self.realm,
+                EventMetric.extra_data['event_key'].as_string().in_(keys)
+            ).all()
+            return {key for (key,) in rows}
+        finally:
+            db.close()
+    
+    async def _store_new_events(self, events: List[Event]):
+        """
+        /events liste les événements en cours à chaque tick : seuls ceux qui apparaissent
+        (absents du tick précédent et pas encore en base) sont enregistrés.
+        """
+        current = {event_key(event): event for event in events}
+        new_keys = [key for key in current if key not in self._listed_events]
+        if new_keys:
+            # Seules les clés stables (id, début) sont recherchées en base, ex. après un redémarrage
+            stable_keys = [key for key in new_keys if current[key].id is not None or current[key].start_time]
+            try:
+                stored = await asyncio.to_thread(self._stored_event_keys, stable_keys) if stable_keys else set()
+            except Exception as e:
+                logger.error(f"Error checking stored events: {e}")
+                return
+            now = datetime.utcnow()
+            rows = [
+                {
+                    "timestamp": now,
+                    "realm": self.realm,
+                    "event_type": current[key].type,
+                    "extra_data": {**msgspec.structs.asdict(current[key]), "event_key": key}
+                }
+                for key in new_keys
+                if key not in stored
+            ]
+            if rows and not await self._store(EventMetric, rows):
+                return
+        self._listed_events = set(current)
+    
+    def _process_nomads(self, payload: NomadsPayload) -> Dict:
+        """Boucle chaude : un seul inc() par couple (action, joueur)"""
+        counts = collections.Counter((nomad.action_type, nomad.player_id or 'unknown') for nomad in payload.nomads)
+        for (action_type, player_id), count in counts.items():
+            nomad_actions.labels(
+                realm=self.realm,
+                action_type=action_type,
+                player_id=player_id
+            ).inc(count)
+        
+        active_nomads.labels(realm=self.realm, player_id='all').set(len(payload.nomads))
+        
+        return {
+            "status": "success",
+            "total_nomads": len(payload.nomads),
+            "failed_actions": sum(1 for nomad in payload.nomads if nomad.status == 'failed'),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    def _process_resources(self, payload: ResourcesPayload) -> Dict:
+        amounts = collections.defaultdict(float)
+        for resource in payload.resources:
+            amounts[(resource.type, resource.player_id or 'unknown')] += resource.amount
+        for (resource_type, player_id), amount in amounts.items():
+            resource_collected.labels(
+                realm=self.realm,
+                resource_type=resource_type,
+                player_id=player_id
+            ).inc(amount)
+        
+        return {
+            "status": "success",
+            "total_resources": len(payload.resources),
+            "total_amount": sum(amounts.values()),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    def _process_dwellings(self, payload: DwellingsPayload) -> Dict:
+        for dwelling in payload.dwellings:
+            if dwelling.level is None:
+                continue
+            dwelling_levels.labels(
+                realm=self.realm,
+                player_id=dwelling.player_id or 'unknown'
+            ).set(dwelling.level)
+        
+        return {
+            "status": "success",
+            "total_dwellings": len(payload.dwellings),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    def _process_pvp(self, payload: PvpPayload) -> Dict:
+        for action_type, count in collections.Counter(action.type for action in payload.pvp_actions).items():
+            pvp_actions.labels(
+                realm=self.realm,
+                action_type=action_type
+            ).inc(count)
+        
+        return {
+            "status": "success",
+            "total_pvp_actions": len(payload.pvp_actions),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    def _process_events(self, payload: EventsPayload) -> Dict:
+        for event_type, count in collections.Counter(event.type for event in payload.events).items():
+            event_triggers.labels(
+                realm=self.realm,
+                event_type=event_type
+            ).inc(count)
+        
+        return {
+            "status": "success",
+            "total_events": len(payload.events),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    async def collect_nomad_metrics(self, persist: bool = False) -> Dict:
         """Collecte les métriques des Nomads"""
         try:
-            data = await self._make_request("/nomads")
+            data = await self._make_request("/nomads", nomads_decoder)
             
             if data is None:
                 return {"status": "error", "message": "Failed to fetch nomad data"}
             
-            # Traiter les données
-            for nomad in data.get('nomads', []):
-                nomad_actions.labels(
-                    action_type=nomad.get('action_type', 'unknown'),
-                    player_id=nomad.get('player_id', 'unknown')
-                ).inc()
+            result = self._process_nomads(data)
             
-            active_nomads.labels(player_id='all').set(len(data.get('nomads', [])))
+            if persist:
+                await self._store_new_actions(data.nomads)
             
-            return {
-                "status": "success",
-                "total_nomads": len(data.get('nomads', [])),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            return result
             
         except Exception as e:
             logger.error(f"Error collecting nomad metrics: {e}")
@@ -147,45 +421,55 @@ class GameplayCollector:
     async def collect_resource_metrics(self) -> Dict:
         """Collecte les métriques des ressources"""
         try:
-            data = await self._make_request("/resources")
+            data = await self._make_request("/resources", resources_decoder)
             
             if data is None:
                 return {"status": "error", "message": "Failed to fetch resource data"}
             
-            for resource in data.get('resources', []):
-                resource_collected.labels(
-                    resource_type=resource.get('type', 'unknown'),
-                    player_id=resource.get('player_id', 'unknown')
-                ).inc(resource.get('amount', 0))
-            
-            return {
-                "status": "success",
-                "total_resources": len(data.get('resources', [])),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            return self._process_resources(data)
             
         except Exception as e:
             logger.error(f"Error collecting resource metrics: {e}")
             return {"status": "error", "message": str(e)}
     
-    async def collect_dwelling_metrics(self) -> Dict:
+    async def collect_dwelling_metrics(self, persist: bool = False) -> Dict:
         """Collecte les métriques des Dwellings"""
         try:
-            data = await self._make_request("/dwellings")
+            data = await self._make_request("/dwellings", dwellings_decoder)
             
             if data is None:
                 return {"status": "error", "message": "Failed to fetch dwelling data"}
             
-            for dwelling in data.get('dwellings', []):
-                dwelling_levels.labels(
-                    player_id=dwelling.get('player_id', 'unknown')
-                ).set(dwelling.get('level', 0))
-            
-            return {
-                "status": "success",
-                "total_dwellings": len(data.get('dwellings', [])),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            result = self._process_dwellings(data)
+            
+            if persist:
+                now = datetime.utcnow()
+                rows = [
+                    {
+                        "timestamp": now,
+                        "realm": self.realm,
+                        "player_id": dwelling.player_id,
+                        "dwelling_level": dwelling.level,
+                        "active_nomads": dwelling.active_nomads,
+                        "gold_amount": dwelling.gold,
+                        "spice_amount": dwelling.spice,
+                        "actions_count": dwelling.actions_count,
+                        "exploration_radius": dwelling.exploration_radius
+                    }
+                    for dwelling in data.dwellings
+                    if dwelling.player_id
+                ]
+                # Seuls les états modifiés et les keyframes sont écrits ; tous les joueurs
+                # vus ce tick alimentent les sketches de joueurs actifs
+                changed = self.activity_changes.changes(rows, now)
+                keyframes = sum(1 for row in changed if row["is_keyframe"])
+                if not rows or await self._store(PlayerActivity, changed, sketch_rows=rows):
+                    self.activity_changes.commit(rows, changed, now)
+                    player_activity_rows.labels(realm=self.realm, kind="keyframe").inc(keyframes)
+                    player_activity_rows.labels(realm=self.realm, kind="delta").inc(len(changed) - keyframes)
+                    player_activity_rows.labels(realm=self.realm, kind="skipped").inc(len(rows) - len(changed))
+            
+            return result
             
         except Exception as e:
             logger.error(f"Error collecting dwelling metrics: {e}")
@@ -194,62 +478,50 @@ class GameplayCollector:
     async def collect_pvp_metrics(self) -> Dict:
         """Collecte les métriques PvP"""
         try:
-            data = await self._make_request("/pvp")
+            data = await self._make_request("/pvp", pvp_decoder)
             
             if data is None:
                 return {"status": "error", "message": "Failed to fetch PvP data"}
             
-            for action in data.get('pvp_actions', []):
-                pvp_actions.labels(
-                    action_type=action.get('type', 'unknown')
-                ).inc()
-            
-            return {
-                "status": "success",
-                "total_pvp_actions": len(data.get('pvp_actions', [])),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            return self._process_pvp(data)
             
         except Exception as e:
             logger.error(f"Error collecting PvP metrics: {e}")
             return {"status": "error", "message": str(e)}
     
-    async def collect_event_metrics(self) -> Dict:
+    async def collect_event_metrics(self, persist: bool = False) -> Dict:
         """Collecte les métriques des événements"""
         try:
-            data = await self._make_request("/events")
+            data = await self._make_request("/events", events_decoder)
             
             if data is None:
                 return {"status": "error", "message": "Failed to fetch event data"}
             
-            for event in data.get('events', []):
-                event_triggers.labels(
-                    event_type=event.get('type', 'unknown')
-                ).inc()
+            result = self._process_events(data)
             
-            return {
-                "status": "success",
-                "total_events": len(data.get('events', [])),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            if persist:
+                await self._store_new_events(data.events)
+            
+            return result
             
         except Exception as e:
             logger.error(f"Error collecting event metrics: {e}")
             return {"status": "error", "message": str(e)}
     
-    async def collect_all_metrics(self) -> Dict:
-        """Collecte toutes les métriques en parallèle"""
+    async def collect_all_metrics(self, persist: bool = False) -> Dict:
+        """Collecte toutes les métriques en parallèle (et les enregistre en base si `persist`)"""
         try:
             results = await asyncio.gather(
-                self.collect_nomad_metrics(),
+                self.collect_nomad_metrics(persist),
                 self.collect_resource_metrics(),
-                self.collect_dwelling_metrics(),
+                self.collect_dwelling_metrics(persist),
                 self.collect_pvp_metrics(),
-                self.collect_event_metrics(),
+                self.collect_event_metrics(persist),
                 return_exceptions=True
             )
             
             return {
+                "realm": self.realm,
                 "nomads": results[0] if not isinstance(results[0], Exception) else {"status": "error"},
                 "resources": results[1] if not isinstance(results[1], Exception) else {"status": "error"},
                 "dwellings": results[2] if not isinstance(results[2], Exception) else {"status": "error"},
@@ -261,6 +533,26 @@ class GameplayCollector:
         except Exception as e:
             logger.error(f"Critical error in collect_all_metrics: {e}")
             return {"status": "error", "message": str(e)}
+    
+    async def run_tick(self) -> Dict:
+        """Tick de collecte : collecte et enregistre tout, puis met à jour les alertes de façon incrémentale"""
+        metrics = await self.collect_all_metrics(persist=True)
+        
+        nomads = metrics.get("nomads", {})
+        if nomads.get("status") == "success":
+            alert_engine.record("nomad_actions", nomads.get("total_nomads", 0), realm=self.realm)
+            alert_engine.record("failed_actions", nomads.get("failed_actions", 0), realm=self.realm)
+        alert_engine.evaluate(realm=self.realm)
+        
+        # Anneau d'activité utilisé par l'analyse d'impact des événements
+        resources = metrics.get("resources", {})
+        event_impact.record_tick(
+            actions=nomads.get("total_nomads", 0) if nomads.get("status") == "success" else 0,
+            resources=resources.get("total_amount", 0) if resources.get("status") == "success" else 0,
+            realm=self.realm
+        )
+        
+        return metrics
 
             
 def inject_mock_metrics():
@@ -280,20 +572,20 @@ def inject_mock_metrics():
         # 3 types d'actions, 7 users
         for a in range(3):
             for u in range(7):
-                nomad_actions.labels(action_type=f"move_{a}", player_id=f"user_{u}").inc(5 + (a + u + i) % 10)
+                nomad_actions.labels(realm="default", action_type=f"move_{a}", player_id=f"user_{u}").inc(5 + (a + u + i) % 10)
     for i in range(5):
-        resource_collected.labels(resource_type=f"gold_{i%2}", player_id=f"user_{i%3}").inc(10 + i)
+        resource_collected.labels(realm="default", resource_type=f"gold_{i%2}", player_id=f"user_{i%3}").inc(10 + i)
     for i in range(3):
-        dwelling_levels.labels(player_id=f"user_{i}").set(1 + i)
-    active_nomads.labels(player_id='all').set(7)
+        dwelling_levels.labels(realm="default", player_id=f"user_{i}").set(1 + i)
+    active_nomads.labels(realm="default", player_id='all').set(7)
     for i in range(4):
-        pvp_actions.labels(action_type=f"attack_{i%2}").inc(2 + i)
+        pvp_actions.labels(realm="default", action_type=f"attack_{i%2}").inc(2 + i)
     for i in range(3):
-        event_triggers.labels(event_type=f"event_{i}").inc(1)
+        event_triggers.labels(realm="default", event_type=f"event_{i}").inc(1)
     for i in range(10):
-        api_response_time.labels(endpoint=f"/api/test_{i%2}").observe(0.1 + 0.05 * (i % 3))
+        api_response_time.labels(realm="default", endpoint=f"/api/test_{i%2}").observe(0.1 + 0.05 * (i % 3))
     for i in range(2):
-        api_errors.labels(endpoint=f"/api/test_{i}", error_type="timeout").inc(1)
+        api_errors.labels(realm="default", endpoint=f"/api/test_{i}", error_type="timeout").inc(1)
 
 # Appelle cette fonction au démarrage (dev uniquement)
 if os.environ.get("INJECT_MOCK_METRICS", "1") == "1":
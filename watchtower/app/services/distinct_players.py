@@ -0,0 +1,168 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Type
+from collections import defaultdict
+from datetime import datetime, timedelta
+import logging
+
+from sqlalchemy import and_, func, or_, select, union
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.metrics import GameplayMetric, PlayerActivity, EventMetric, PlayerSketch
+from app.services.hll import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+# Dimension globale (tous royaumes) ; les autres sont propres à un royaume
+DIMENSION_ALL = "all"
+DIMENSION_REALM = "realm"
+DIMENSION_CLAN = "clan"
+DIMENSION_EVENT = "event"
+
+# Les timestamps sont stockés en UTC naïf
+EPOCH = datetime(1970, 1, 1)
+
+SketchKey = Tuple[datetime, str, str]
+
+
+def bucket_start(ts: datetime) -> datetime:
+    """Début du bucket de temps contenant ts"""
+    seconds = int((ts - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % settings.HLL_BUCKET_SECONDS)
+
+
+def scoped_key(realm: Optional[str], value) -> str:
+    """Identifiant unique entre royaumes (inchangé pour le royaume par défaut)"""
+    realm = realm or "default"
+    return str(value) if realm == "default" else f"{realm}:{value}"
+
+
+def _activity_keys(model: Type, row: Dict) -> Iterable[Tuple[str, str, str]]:
+    """(dimension, clé, player_id) alimentés par une ligne insérée"""
+    realm = row.get("realm") or "default"
+    if model is PlayerActivity:
+        if row.get("player_id"):
+            player_id = scoped_key(realm, row["player_id"])
+            yield DIMENSION_ALL, DIMENSION_ALL, player_id
+            yield DIMENSION_REALM, realm, player_id
+    elif model is GameplayMetric:
+        # Seules les actions de jeu comptent comme activité (pas les agrégats)
+        if row.get("metric_type") == "nomad_action" and row.get("player_id"):
+            player_id = scoped_key(realm, row["player_id"])
+            yield DIMENSION_ALL, DIMENSION_ALL, player_id
+            yield DIMENSION_REALM, realm, player_id
+            if row.get("clan_id"):
+                yield DIMENSION_CLAN, scoped_key(realm, row["clan_id"]), player_id
+    elif model is EventMetric:
+        for player_id in (row.get("extra_data") or {}).get("player_ids") or []:
+            yield DIMENSION_EVENT, scoped_key(realm, row.get("event_type") or "unknown"), scoped_key(realm, player_id)
+
+
+def _upsert_statement(db: Session):
+    """INSERT ... ON CONFLICT DO NOTHING selon le dialecte"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(PlayerSketch).on_conflict_do_nothing(
+        index_elements=["bucket", "dimension", "key"]
+    )
+
+
+def record_rows(db: Session, model: Type, rows: List[Dict]):
+    """
+    Alimente les sketches de joueurs distincts à l'ingestion.
+    À appeler dans la transaction d'insertion des lignes.
+    """
+    players: Dict[SketchKey, Set[str]] = defaultdict(set)
+    for row in rows:
+        bucket = bucket_start(row.get("timestamp") or datetime.utcnow())
+        for dimension, key, player_id in _activity_keys(model, row):
+            players[(bucket, dimension, key)].add(player_id)
+
+    if not players:
+        return
+
+    # Création des sketches manquants sans conflit entre écrivains concurrents
+    upsert = _upsert_statement(db)
+    empty = bytes(1 << settings.HLL_PRECISION)
+    new_rows = [
+        {"bucket": bucket, "dimension": dimension, "key": key, "registers": empty}
+        for bucket, dimension, key in players
+    ]
+    if upsert is not None:
+        db.execute(upsert, new_rows)
+
+    # Verrouillage puis fusion des registres (max) dans les sketches existants
+    existing = {
+        (s.bucket, s.dimension, s.key): s
+        for s in db.query(PlayerSketch).filter(or_(*[
+            and_(PlayerSketch.bucket == bucket, PlayerSketch.dimension == dimension, PlayerSketch.key == key)
+            for bucket, dimension, key in players
+        ])).order_by(PlayerSketch.id).with_for_update()
+    }
+    for sketch_key, player_ids in players.items():
+        sketch = existing.get(sketch_key)
+        if sketch is None:
+            bucket, dimension, key = sketch_key
+            sketch = PlayerSketch(bucket=bucket, dimension=dimension, key=key, registers=empty)
+            db.add(sketch)
+        hll = HyperLogLog(settings.HLL_PRECISION, sketch.registers)
+        hll.update(player_ids)
+        sketch.registers = hll.to_bytes()
+
+    db.flush()
+
+
+def count_distinct_players(db: Session, start: datetime, end: datetime,
+                           dimension: str = DIMENSION_ALL, key: str = DIMENSION_ALL) -> int:
+    """
+    Nombre estimé de joueurs distincts sur [start, end), par fusion des sketches.
+    La fenêtre est arrondie aux buckets de HLL_BUCKET_SECONDS.
+    """
+    hll = HyperLogLog(settings.HLL_PRECISION)
+    sketches = db.query(PlayerSketch.registers).filter(
+        PlayerSketch.bucket >= bucket_start(start),
+        PlayerSketch.bucket < end,
+        PlayerSketch.dimension == dimension,
+        PlayerSketch.key == key
+    ).yield_per(100)
+    for (registers,) in sketches:
+        hll.merge(HyperLogLog(settings.HLL_PRECISION, registers))
+    return hll.count()
+
+
+def sketches_cover(db: Session, start: datetime,
+                   dimension: str = DIMENSION_ALL, key: str = DIMENSION_ALL) -> bool:
+    """Vrai si les sketches de cette dimension étaient déjà alimentés au début de la fenêtre"""
+    first_bucket = db.query(func.min(PlayerSketch.bucket)).filter(
+        PlayerSketch.dimension == dimension,
+        PlayerSketch.key == key
+    ).scalar()
+    return first_bucket is not None and first_bucket <= bucket_start(start)
+
+
+def count_distinct_players_exact(db: Session, start: datetime, end: datetime,
+                                 realm: Optional[str] = None) -> int:
+    """
+    COUNT(DISTINCT) sur les lignes brutes (mêmes sources que les dimensions globale et royaume
+    des sketches), pour l'historique ingéré avant leur mise en place.
+    """
+    activity = select(PlayerActivity.realm, PlayerActivity.player_id).where(
+        PlayerActivity.timestamp >= start,
+        PlayerActivity.timestamp < end,
+        PlayerActivity.player_id.isnot(None)
+    )
+    actions = select(GameplayMetric.realm, GameplayMetric.player_id).where(
+        GameplayMetric.timestamp >= start,
+        GameplayMetric.timestamp < end,
+        GameplayMetric.metric_type == "nomad_action",
+        GameplayMetric.player_id.isnot(None)
+    )
+    if realm is not None:
+        activity = activity.where(PlayerActivity.realm == realm)
+        actions = actions.where(GameplayMetric.realm == realm)
+    players = union(activity, actions).subquery()
+    return db.query(func.count()).select_from(players).scalar()
@@ -0,0 +1,47 @@
+from typing import List, Tuple
+
+Point = Tuple[float, float]
+
+
+def lttb(points: List[Point], threshold: int) -> List[Point]:
+    """
+    Largest-Triangle-Three-Buckets : réduit une série à `threshold` points
+    en conservant sa forme (pics et creux). Les points doivent être triés par x.
+    """
+    n = len(points)
+    if threshold >= n:
+        return list(points)
+    if threshold < 3:
+        return [points[0], points[-1]][:threshold]
+
+    sampled = [points[0]]
+    # Le premier et le dernier point sont toujours conservés
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Moyenne du bucket suivant (troisième sommet du triangle)
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        next_count = next_end - next_start
+        avg_x = sum(p[0] for p in points[next_start:next_end]) / next_count
+        avg_y = sum(p[1] for p in points[next_start:next_end]) / next_count
+
+        # Point du bucket courant formant le plus grand triangle
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = points[a]
+        max_area = -1.0
+        max_idx = start
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                max_idx = j
+
+        sampled.append(points[max_idx])
+        a = max_idx
+
+    sampled.append(points[-1])
+    return sampled
@@ -0,0 +1,214 @@
+from typing import Dict, List, Optional, Tuple
+from bisect import bisect_right, insort
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import threading
+import time
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models.metrics import EventMetric
+from app.services.distinct_players import count_distinct_players, scoped_key, DIMENSION_EVENT
+
+logger = logging.getLogger(__name__)
+
+# Nombre d'événements conservés dans l'index en mémoire
+TOP_EVENTS_CAPACITY = 100
+
+# Les timestamps sont stockés en UTC naïf
+EPOCH = datetime(1970, 1, 1)
+
+
+def _to_epoch(ts: datetime) -> float:
+    return (ts - EPOCH).total_seconds()
+
+
+class ActivityRing:
+    """
+    Anneau des derniers ticks de collecte avec sommes cumulées :
+    la somme sur n'importe quelle fenêtre se lit en O(log n), sans requête SQL.
+    """
+
+    def __init__(self, retention_seconds: int):
+        self.retention = retention_seconds
+        self._timestamps: List[float] = []
+        # Cumuls (actions, ressources) jusqu'au tick inclus
+        self._cumulative: List[Tuple[float, float]] = []
+        # Cumul des ticks déjà purgés
+        self._base: Tuple[float, float] = (0.0, 0.0)
+        self._offset = 0
+        # Écrit par le tick de collecte, lu par l'étape de fond (thread)
+        self._lock = threading.Lock()
+
+    def add(self, ts: float, actions: float, resources: float):
+        with self._lock:
+            self._add(ts, actions, resources)
+
+    def _add(self, ts: float, actions: float, resources: float):
+        last_actions, last_resources = self._cumulative[-1] if self._cumulative else self._base
+        self._timestamps.append(ts)
+        self._cumulative.append((last_actions + actions, last_resources + resources))
+
+        # Purge amortie des ticks sortis de la rétention
+        cutoff = bisect_right(self._timestamps, ts - self.retention, lo=self._offset)
+        self._offset = cutoff
+        if self._offset > len(self._timestamps) // 2:
+            self._base = self._cumulative[self._offset - 1]
+            del self._timestamps[:self._offset]
+            del self._cumulative[:self._offset]
+            self._offset = 0
+
+    @property
+    def oldest(self) -> Optional[float]:
+        return self._timestamps[self._offset] if self._offset < len(self._timestamps) else None
+
+    @property
+    def newest(self) -> Optional[float]:
+        return self._timestamps[-1] if self._timestamps else None
+
+    def _cumulative_at(self, ts: float) -> Tuple[float, float]:
+        idx = bisect_right(self._timestamps, ts) - 1
+        return self._cumulative[idx] if idx >= 0 else self._base
+
+    def rates(self, start: float, end: float) -> Tuple[float, float]:
+        """Débits moyens (actions/s, ressources/s) sur ]start, end]"""
+        with self._lock:
+            actions_end, resources_end = self._cumulative_at(end)
+            actions_start, resources_start = self._cumulative_at(start)
+        duration = end - start
+        return (actions_end - actions_start) / duration, (resources_end - resources_start) / duration
+
+
+def _relative_change(before: float, after: float) -> float:
+    if before <= 0:
+        return 0.0 if after <= 0 else 1.0
+    return (after - before) / before
+
+
+class EventImpactAnalyzer:
+    """
+    Étape de fond : corrèle chaque événement de jeu (tempête, raid, bénédiction, faille)
+    avec l'activité et les ressources avant/après, écrit `impact_score` et maintient
+    un classement des événements en mémoire.
+    """
+
+    def __init__(self, window_seconds: int, retention_seconds: int):
+        self.window = window_seconds
+        self.retention = retention_seconds
+        # Un anneau par royaume : un événement est comparé à l'activité de son royaume
+        self.rings: Dict[str, ActivityRing] = {}
+        # Classement trié par impact absolu décroissant : (-|impact|, id, entrée)
+        self._top: List[Tuple[float, int, Dict]] = []
+
+    def record_tick(self, actions: float, resources: float, ts: Optional[float] = None, realm: str = "default"):
+        ring = self.rings.get(realm)
+        if ring is None:
+            ring = self.rings[realm] = ActivityRing(self.retention)
+        ring.add(ts if ts is not None else time.time(), actions, resources)
+
+    def _index(self, entry: Dict):
+        insort(self._top, (-abs(entry["impact_score"]), entry["id"], entry))
+        del self._top[TOP_EVENTS_CAPACITY:]
+
+    def top_events(self, limit: int = 10) -> List[Dict]:
+        """Événements classés par impact, servis depuis l'index en mémoire"""
+        return [entry for _, _, entry in self._top[:limit]]
+
+    def load_index(self, db: Session, since: timedelta = timedelta(hours=24)):
+        """Recharge le classement depuis la base (au démarrage)"""
+        events = db.query(EventMetric).filter(
+            EventMetric.impact_score.isnot(None),
+            EventMetric.timestamp >= datetime.utcnow() - since
+        ).order_by(
+            func.abs(EventMetric.impact_score).desc()
+        ).limit(TOP_EVENTS_CAPACITY).all()
+
+        self._top = []
+        for event in events:
+            self._index(self._entry(event, event.impact_score, event.affected_players))
+
+    def _entry(self, event: EventMetric, impact_score: float, affected_players: Optional[int]) -> Dict:
+        return {
+            "id": event.id,
+            "event_type": event.event_type,
+            "realm": event.realm,
+            "timestamp": event.timestamp.isoformat(),
+            "impact_score": impact_score,
+            "affected_players": affected_players
+        }
+
+    def process_pending(self, db: Session, batch_size: int = 500) -> int:
+        """Calcule l'impact des événements dont la fenêtre 'après' est écoulée"""
+        updates = []
+        for realm, ring in list(self.rings.items()):
+            updates.extend(self._process_realm(db, realm, ring, batch_size))
+
+        if updates:
+            db.execute(update(EventMetric), updates)
+            db.commit()
+            logger.info(f"Computed impact of {len(updates)} events")
+
+        return len(updates)
+
+    def _process_realm(self, db: Session, realm: str, ring: ActivityRing, batch_size: int) -> List[Dict]:
+        oldest, newest = ring.oldest, ring.newest
+        if oldest is None:
+            return []
+
+        # Seuls les événements entièrement couverts par l'anneau du royaume sont analysables
+        events = db.query(EventMetric).filter(
+            EventMetric.realm == realm,
+            EventMetric.impact_score.is_(None),
+            EventMetric.timestamp >= EPOCH + timedelta(seconds=oldest + self.window),
+            EventMetric.timestamp <= EPOCH + timedelta(seconds=newest - self.window)
+        ).order_by(EventMetric.timestamp).limit(batch_size).all()
+
+        updates = []
+        for event in events:
+            ts = _to_epoch(event.timestamp)
+            actions_before, resources_before = ring.rates(ts - self.window, ts)
+            actions_after, resources_after = ring.rates(ts, ts + self.window)
+            impact_score = round((
+                _relative_change(actions_before, actions_after)
+                + _relative_change(resources_before, resources_after)
+            ) / 2, 4)
+
+            player_ids = (event.extra_data or {}).get("player_ids")
+            if player_ids is not None:
+                affected_players = len(player_ids)
+            else:
+                affected_players = count_distinct_players(
+                    db, event.timestamp, event.timestamp + timedelta(seconds=self.window),
+                    DIMENSION_EVENT, scoped_key(event.realm, event.event_type)
+                )
+
+            updates.append({"id": event.id, "impact_score": impact_score, "affected_players": affected_players})
+            self._index(self._entry(event, impact_score, affected_players))
+
+        return updates
+
+
+event_impact = EventImpactAnalyzer(
+    window_seconds=settings.EVENT_IMPACT_WINDOW,
+    retention_seconds=settings.EVENT_IMPACT_RETENTION
+)
+
+
+def _run_stage():
+    db = SessionLocal()
+    try:
+        event_impact.process_pending(db)
+    finally:
+        db.close()
+
+
+async def run_event_impact_stage():
+    """Job planifié : analyse d'impact exécutée hors de la boucle d'événements"""
+    try:
+        await asyncio.to_thread(_run_stage)
+    except Exception as e:
+        logger.error(f"Error in event impact stage: {e}")
@@ -0,0 +1,267 @@
+from typing import Dict, Iterator, List, Optional, Set
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.models.metrics import GameplayMetric, PlayerActivity, EventMetric
+
+logger = logging.getLogger(__name__)
+
+# Nombre de lignes lues par aller-retour sur le curseur serveur
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Tables exportables : colonne de partitionnement secondaire (en plus du jour)
+EXPORT_TABLES = {
+    "gameplay_metrics": (GameplayMetric, "metric_type"),
+    "player_activity": (PlayerActivity, None),
+    "event_metrics": (EventMetric, "event_type"),
+}
+
+_ARROW_TYPES = {
+    "id": pa.int64(),
+    "timestamp": pa.timestamp("us"),
+    "realm": pa.string(),
+    "metric_type": pa.string(),
+    "metric_name": pa.string(),
+    "value": pa.float64(),
+    "extra_data": pa.string(),
+    "player_id": pa.string(),
+    "clan_id": pa.string(),
+    "dwelling_level": pa.int64(),
+    "active_nomads": pa.int64(),
+    "gold_amount": pa.float64(),
+    "spice_amount": pa.float64(),
+    "actions_count": pa.int64(),
+    "exploration_radius": pa.float64(),
+    "is_keyframe": pa.bool_(),
+    "event_type": pa.string(),
+    "affected_players": pa.int64(),
+    "impact_score": pa.float64(),
+}
+
+CHECKPOINT_FILE = "_export_state.json"
+
+
+def _table_schema(table_name: str, exclude: Optional[str] = None) -> pa.Schema:
+    model, _ = EXPORT_TABLES[table_name]
+    return pa.schema([
+        (c.name, _ARROW_TYPES[c.name]) for c in model.__table__.columns if c.name != exclude
+    ])
+
+
+def _string_columns(schema: pa.Schema) -> List[str]:
+    return [f.name for f in schema if pa.types.is_string(f.type)]
+
+
+def _rows_to_batch(rows, schema: pa.Schema) -> pa.RecordBatch:
+    """Convertit un chunk de lignes SQL en RecordBatch colonnaire"""
+    columns = []
+    for field in schema:
+        values = [row._mapping[field.name] for row in rows]
+        if field.name == "extra_data":
+            values = [json.dumps(v) if v is not None else None for v in values]
+        columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _writer(sink, schema: pa.Schema) -> pq.ParquetWriter:
+    # Les colonnes texte (metric_type, player_id...) ont une faible cardinalité
+    return pq.ParquetWriter(
+        sink,
+        schema,
+        compression="zstd",
+        use_dictionary=_string_columns(schema),
+    )
+
+
+def _stream_rows(engine: Engine, table_name: str, start: datetime, end: datetime,
+                 chunk_size: int, order_by_partition: bool = False) -> Iterator[list]:
+    """Lit la table par chunks via un curseur côté serveur (mémoire constante)"""
+    model, partition_col = EXPORT_TABLES[table_name]
+    table = model.__table__
+    order = [table.c.id]
+    if order_by_partition and partition_col:
+        order.insert(0, table.c[partition_col])
+
+    stmt = (
+        select(*table.columns)
+        .where(table.c.timestamp >= start, table.c.timestamp < end)
+        .order_by(*order)
+    )
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(stmt)
+        for partition in result.partitions(chunk_size):
+            yield partition
+
+
+class ParquetExporter:
+    """
+    Exporte l'historique gameplay en Parquet partitionné par jour et par type.
+    Reprend l'export à partir de la dernière partition complète.
+    """
+
+    def __init__(self, engine: Engine, output_dir: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.engine = engine
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self._checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+
+    def _load_checkpoint(self) -> Dict[str, Set[str]]:
+        """Jours complets déjà exportés, par table"""
+        if not os.path.exists(self._checkpoint_path):
+            return {}
+        with open(self._checkpoint_path) as f:
+            state = json.load(f)
+        # Les anciens checkpoints (dernier jour exporté) ne sont pas réutilisés
+        return {table: set(days) for table, days in state.items() if isinstance(days, list)}
+
+    def _save_checkpoint(self, state: Dict[str, Set[str]]):
+        tmp_path = f"{self._checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({table: sorted(days) for table, days in state.items()}, f, indent=2)
+        os.replace(tmp_path, self._checkpoint_path)
+
+    def _partition_dir(self, table_name: str, day: datetime, partition_value: Optional[str]) -> str:
+        path = os.path.join(self.output_dir, table_name, f"day={day.strftime('%Y-%m-%d')}")
+        _, partition_col = EXPORT_TABLES[table_name]
+        if partition_col:
+            path = os.path.join(path, f"{partition_col}={partition_value or 'unknown'}")
+        return path
+
+    def export_day(self, table_name: str, day: datetime, end: Optional[datetime] = None) -> int:
+        """Exporte une journée d'une table, une partition (fichier) par type"""
+        day_end = day + timedelta(days=1)
+        if end is not None:
+            day_end = min(day_end, end)
+        _, partition_col = EXPORT_TABLES[table_name]
+        # La colonne de partition est portée par le chemin (hive), pas par le fichier
+        schema = _table_schema(table_name, exclude=partition_col)
+
+        writer = None
+        current_value = None
+        tmp_path = final_path = None
+        total = 0
+
+        def close_current():
+            if writer is not None:
+                writer.close()
+                os.replace(tmp_path, final_path)
+
+        try:
+            for rows in _stream_rows(self.engine, table_name, day, day_end,
+                                     self.chunk_size, order_by_partition=True):
+                # Les lignes arrivent triées par partition : un seul writer ouvert à la fois
+                start = 0
+                while start < len(rows):
+                    value = rows[start]._mapping[partition_col] if partition_col else None
+                    stop = start
+                    while stop < len(rows) and (not partition_col or rows[stop]._mapping[partition_col] == value):
+                        stop += 1
+
+                    if writer is None or value != current_value:
+                        close_current()
+                        directory = self._partition_dir(table_name, day, value)
+                        os.makedirs(directory, exist_ok=True)
+                        final_path = os.path.join(directory, "part-0.parquet")
+                        tmp_path = f"{final_path}.tmp"
+                        writer = _writer(tmp_path, schema)
+                        current_value = value
+
+                    writer.write_batch(_rows_to_batch(rows[start:stop], schema))
+                    total += stop - start
+                    start = stop
+            close_current()
+        except Exception:
+            if writer is not None:
+                writer.close()
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return total
+
+    def export(self, tables: List[str], start: datetime, end: datetime) -> Dict[str, int]:
+        """Exporte les tables jour par jour entre start (inclus) et end (exclu)"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        state = self._load_checkpoint()
+        exported = {}
+        start_day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        for table_name in tables:
+            if table_name not in EXPORT_TABLES:
+                raise ValueError(f"Unknown table: {table_name}")
+
+            done = state.setdefault(table_name, set())
+            day = start_day
+            count = 0
+            skipped = 0
+            while day < end:
+                day_key = day.strftime("%Y-%m-%d")
+                if day_key in done:
+                    skipped += 1
+                else:
+                    count += self.export_day(table_name, day, end)
+                    # Une journée n'est marquée terminée qu'une fois complète
+                    if day + timedelta(days=1) <= end:
+                        done.add(day_key)
+                        self._save_checkpoint(state)
+                day += timedelta(days=1)
+
+            if skipped:
+                logger.info(f"Skipped {skipped} already exported days of {table_name}")
+            exported[table_name] = count
+            logger.info(f"Exported {count} rows from {table_name}")
+
+        return exported
+
+
+class _ChunkSink:
+    """Sink Parquet non seekable dont on vide les octets au fil de l'écriture"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def stream_parquet(engine: Engine, table_name: str, start: datetime, end: datetime,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Génère un fichier Parquet d'une table, un row group par chunk lu"""
+    if table_name not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table: {table_name}")
+
+    schema = _table_schema(table_name)
+    sink = _ChunkSink()
+    writer = _writer(sink, schema)
+    try:
+        for rows in _stream_rows(engine, table_name, start, end, chunk_size):
+            writer.write_batch(_rows_to_batch(rows, schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -96,9 +96,15 @@ class NomadStatsService:
         Retourne la liste des IDs des 5% de joueurs qui dépassent le plus la moyenne globale de moves.
         """
         moves_per_user = self.get_mock_moves_per_user(user_ids)
+        return self.top_5_percent_from_counts(moves_per_user, global_avg)
+
+    def top_5_percent_from_counts(self, counts: Dict[str, int], global_avg: float) -> List[str]:
+        """
+        Retourne les IDs des 5% de joueurs qui dépassent le plus la moyenne globale, à partir de leurs compteurs.
+        """
         # Filtrer ceux qui dépassent la moyenne
-        above_avg = [(user_id, moves) for user_id, moves in moves_per_user.items() if moves > global_avg]
-        # Trier par moves décroissant
+        above_avg = [(user_id, count) for user_id, count in counts.items() if count > global_avg]
+        # Trier par compteur décroissant
         above_avg.sort(key=lambda x: x[1], reverse=True)
         # Garder les 5% les plus hauts
         n = max(1, int(len(above_avg) * 0.05))
@@ -137,10 +143,7 @@ class NomadStatsService:
         Retourne la liste des IDs des 5% de joueurs qui dépassent le plus la moyenne globale de nomads créés.
         """
         created_per_user = self.get_mock_nomads_created_per_user(user_ids)
-        above_avg = [(user_id, created) for user_id, created in created_per_user.items() if created > global_avg]
-        above_avg.sort(key=lambda x: x[1], reverse=True)
-        n = max(1, int(len(above_avg) * 0.05))
-        return [user_id for user_id, _ in above_avg[:n]]
+        return self.top_5_percent_from_counts(created_per_user, global_avg)
 
     async def send_suspect_created_ids_nats(self, user_ids: List[str]):
         """
@@ -0,0 +1,104 @@
+from typing import Dict, List, Optional
+import asyncio
+import logging
+
+from prometheus_client import Gauge
+
+from app.config import settings
+from app.services.collector import GameplayCollector
+
+logger = logging.getLogger(__name__)
+
+realm_up = Gauge(
+    'ccc_realm_up',
+    'Whether the last collection tick of a realm succeeded (1) or failed (0)',
+    ['realm']
+)
+
+realm_consecutive_failures = Gauge(
+    'ccc_realm_consecutive_failures',
+    'Consecutive failed collection ticks per realm',
+    ['realm']
+)
+
+
+class RealmManager:
+    """
+    Collecte multi-royaumes : un GameplayCollector (et son pool de connexions)
+    par royaume, chacun avec son propre intervalle, dans la même boucle d'événements.
+    L'échec d'un royaume n'affecte pas les autres.
+    """
+
+    def __init__(self, realms: List[Dict]):
+        self.realms = {realm["name"]: realm for realm in realms}
+        self.collectors: Dict[str, GameplayCollector] = {
+            realm["name"]: GameplayCollector(
+                realm=realm["name"],
+                base_url=realm["url"],
+                api_key=realm.get("api_key")
+            )
+            for realm in realms
+        }
+        self._failures: Dict[str, int] = {name: 0 for name in self.collectors}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def default_realm(self) -> str:
+        return next(iter(self.collectors))
+
+    def get(self, realm: Optional[str] = None) -> Optional[GameplayCollector]:
+        return self.collectors.get(realm or self.default_realm)
+
+    def _is_failure(self, metrics: Dict) -> bool:
+        if metrics.get("status") == "error":
+            return True
+        sections = [v for v in metrics.values() if isinstance(v, dict)]
+        return bool(sections) and all(section.get("status") == "error" for section in sections)
+
+    async def run_realm_tick(self, realm: str) -> Dict:
+        """
+        Tick d'un royaume, ou le tick déjà en cours pour ce royaume (single-flight) :
+        planificateur et collecte manuelle ne persistent jamais deux ticks simultanés.
+        """
+        task = self._in_flight.get(realm)
+        if task is None:
+            task = asyncio.ensure_future(self._run_realm_tick(realm))
+            self._in_flight[realm] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(realm, None))
+        # shield : l'annulation d'un appelant n'interrompt pas le tick partagé
+        return await asyncio.shield(task)
+
+    async def _run_realm_tick(self, realm: str) -> Dict:
+        """Tick d'un royaume, isolé : les erreurs sont journalisées et comptées"""
+        try:
+            metrics = await self.collectors[realm].run_tick()
+            failed = self._is_failure(metrics)
+        except Exception as e:
+            logger.error(f"Collection tick failed for realm {realm}: {e}")
+            metrics = {"realm": realm, "status": "error", "message": str(e)}
+            failed = True
+
+        self._failures[realm] = self._failures[realm] + 1 if failed else 0
+        realm_up.labels(realm=realm).set(0 if failed else 1)
+        realm_consecutive_failures.labels(realm=realm).set(self._failures[realm])
+        return metrics
+
+    def schedule(self, scheduler):
+        """Un job par royaume, à son propre intervalle (jamais deux ticks simultanés)"""
+        for name, realm in self.realms.items():
+            scheduler.add_job(
+                self.run_realm_tick,
+                'interval',
+                seconds=realm["interval"],
+                args=[name],
+                id=f"collect_{name}",
+                max_instances=1,
+                coalesce=True
+            )
+
+    async def close(self):
+        for collector in self.collectors.values():
+            await collector.client.aclose()
+
+
+realm_manager = RealmManager(settings.CCC_REALMS)
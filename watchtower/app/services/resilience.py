@@ -0,0 +1,116 @@
+from typing import Optional
+from collections import deque
+import logging
+import math
+import time
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+circuit_state = Gauge(
+    'ccc_circuit_breaker_state',
+    'Circuit breaker state per API endpoint (0=closed, 1=half-open, 2=open)',
+    ['realm', 'endpoint']
+)
+
+circuit_failures = Gauge(
+    'ccc_circuit_breaker_consecutive_failures',
+    'Consecutive failed calls per API endpoint',
+    ['realm', 'endpoint']
+)
+
+circuit_rejected = Counter(
+    'ccc_circuit_breaker_rejected_total',
+    'Calls rejected without reaching the API because the circuit is open',
+    ['realm', 'endpoint']
+)
+
+hedged_requests = Counter(
+    'ccc_hedged_requests_total',
+    'Hedged (duplicate) GET requests sent, and how many answered first',
+    ['realm', 'endpoint', 'outcome']
+)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur d'un endpoint : closed -> open après `failure_threshold` échecs consécutifs,
+    puis half-open après `reset_timeout` (un seul appel d'essai) -> closed ou open.
+    """
+
+    def __init__(self, realm: str, endpoint: str, failure_threshold: int, reset_timeout: float):
+        self.realm = realm
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._export()
+
+    def _export(self):
+        circuit_state.labels(realm=self.realm, endpoint=self.endpoint).set(STATE_VALUES[self.state])
+        circuit_failures.labels(realm=self.realm, endpoint=self.endpoint).set(self.failures)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit {self.state} -> {state} on {self.realm}{self.endpoint}")
+            self.state = state
+
+    def allow(self) -> bool:
+        """Vrai si l'appel peut partir ; sinon échec immédiat"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+            self._export()
+
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+
+        circuit_rejected.labels(realm=self.realm, endpoint=self.endpoint).inc()
+        return False
+
+    def record_success(self):
+        self._probe_in_flight = False
+        self.failures = 0
+        self._transition(CLOSED)
+        self._export()
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._transition(OPEN)
+            self.opened_at = time.monotonic()
+        self._export()
+
+
+class LatencyTracker:
+    """Latences récentes d'un endpoint ; le quantile sert de délai avant la requête couverte"""
+
+    def __init__(self, quantile: float, min_samples: int, min_delay: float, size: int = 200):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._samples: deque = deque(maxlen=size)
+
+    def observe(self, duration: float):
+        self._samples.append(duration)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Délai avant d'envoyer une seconde requête, None tant que l'historique est insuffisant"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, math.ceil(self.quantile * len(ordered)) - 1)
+        return max(self.min_delay, ordered[index])
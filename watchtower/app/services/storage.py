@@ -0,0 +1,29 @@
+from typing import Dict, List, Optional, Type
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.services.distinct_players import record_rows
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def bulk_insert(db: Session, model: Type, rows: List[Dict], commit: bool = True,
+                sketch_rows: Optional[List[Dict]] = None) -> int:
+    """
+    Insère des lignes en une seule requête executemany (sans instancier d'objets ORM).
+    `sketch_rows` : lignes qui alimentent les sketches si elles diffèrent des lignes insérées
+    (ex. tous les joueurs vus alors que seuls les états modifiés sont écrits).
+    """
+    sketch_rows = rows if sketch_rows is None else sketch_rows
+    if not rows and not sketch_rows:
+        return 0
+    
+    if rows:
+        db.execute(insert(model), rows)
+    # Sketches de joueurs distincts mis à jour dans la même transaction
+    record_rows(db, model, sketch_rows)
+    if commit:
+        db.commit()
+    
+    logger.debug(f"Inserted {len(rows)} rows into {model.__tablename__}")
+    return len(rows)